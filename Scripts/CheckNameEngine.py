@@ -0,0 +1,117 @@
+"""Check NameEngine against the golden corpus of file names, and time it.
+
+NameCorpus.csv holds messy names next to the output the original rule by rule chain
+gave them. Run from the repository root:
+
+    python -m Scripts.CheckNameEngine [count]   check the corpus, then time count names
+    python -m Scripts.CheckNameEngine --regenerate   rewrite the corpus from FormatName
+"""
+
+import csv
+import random
+import sys
+import time
+from pathlib import Path
+
+from Src.Images.FixNames import FormatName, NameEngine
+
+CORPUS: Path = Path(__file__).with_name("NameCorpus.csv")
+EDGE_CASES: list[str] = ["", " ", "_", "...", "#1", "Part", "a\nb 1", "x\n", "I'Ve", "ABCdef12"]
+
+
+def SyntheticNames(count: int, seed: int = 0) -> list[str]:
+    """Build a repeatable set of messy file names exercising every naming rule.
+
+    Parameters
+    ----------
+    count : int
+        number of names
+    seed : int, optional
+        random seed, by default 0
+
+    Returns
+    -------
+    list[str]
+        file names without suffixes
+    """
+    rng = random.Random(seed)
+    words = ["dog", "Cat", "iPhone", "McDonald", "O'Neil", "i've", "IT'S", "HTMLParser", "x"]
+    tags = [" P", " Pg", " Part", " Pt", " Chapter", " Commission", " Tgtf", " Comm", " Ch", " #"]
+    joins = [" ", "_", "_20", "_%20", " - ", "-", "+", "  ", "(", ")", "...", "\t"]
+    names: list[str] = []
+    for _ in range(count):
+        parts = [rng.choice(words) for _ in range(rng.randint(1, 4))]
+        name = "".join(x + rng.choice(joins) for x in parts)
+        if rng.random() < 0.4:
+            name += rng.choice(tags)
+        if rng.random() < 0.6:
+            name += rng.choice(["", " "]) + str(rng.randint(0, 2000))
+        names.append(name)
+    return names
+
+
+def LoadCorpus() -> list[tuple[str, str]]:
+    """Read the golden corpus.
+
+    Returns
+    -------
+    list[tuple[str, str]]
+        name and its expected formatted name
+    """
+    with CORPUS.open(newline="", encoding="utf-8") as f:
+        return [(name, expected) for name, expected in csv.reader(f)]
+
+
+def WriteCorpus(count: int = 5000) -> None:
+    """Rewrite the golden corpus from the reference chain, only when the rules change.
+
+    Parameters
+    ----------
+    count : int, optional
+        number of synthetic names, by default 5000
+    """
+    with CORPUS.open("w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows((x, FormatName(x)) for x in EDGE_CASES + SyntheticNames(count))
+
+
+def CheckNameEngine() -> None:
+    """Compare NameEngine and FormatName with every expected name in the corpus."""
+    engine = NameEngine()
+    corpus = LoadCorpus()
+    for label, formatter in [("NameEngine", engine.Format), ("FormatName", FormatName)]:
+        mismatches = [(x, y, formatter(x)) for x, y in corpus if formatter(x) != y]
+        if mismatches:
+            raise AssertionError(f"{label}: {len(mismatches)} names differ -> {mismatches[0]}")
+    print(f"{len(corpus)} corpus names match")
+
+
+def BenchmarkNameEngine(count: int = 100_000) -> None:
+    """Time NameEngine against the rule by rule FormatName on synthetic names.
+
+    Parameters
+    ----------
+    count : int, optional
+        number of synthetic names, by default 100_000
+    """
+    names = SyntheticNames(count)
+    start = time.perf_counter()
+    expected = [FormatName(x) for x in names]
+    reference = time.perf_counter() - start
+
+    engine = NameEngine()
+    start = time.perf_counter()
+    actual = [engine.Format(x) for x in names]
+    compiled = time.perf_counter() - start
+
+    if expected != actual:
+        raise AssertionError("NameEngine and FormatName disagree on synthetic names")
+    print(f"FormatName {reference:.2f}s, NameEngine {compiled:.2f}s for {count} names")
+    print(f"{reference / compiled:.1f}x faster")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--regenerate"]:
+        WriteCorpus()
+    else:
+        CheckNameEngine()
+        BenchmarkNameEngine(*[int(x) for x in sys.argv[1:2]])
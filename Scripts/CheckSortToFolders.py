@@ -0,0 +1,158 @@
+"""Check SortToFolders against the golden corpus of folder layouts.
+
+SortCorpus.json holds flat folders of numbered files, and the tree and messages each
+gave with the original glob and regex implementation, kept here as LegacySortToFolders.
+The original walked sequence names in set order, which changes between runs when one
+sequence name prefixes another, so the legacy version takes the longest first, the order
+SequencePlan settles on. Run from the repository root:
+
+    python -m Scripts.CheckSortToFolders
+    python -m Scripts.CheckSortToFolders --regenerate
+"""
+
+import contextlib
+import json
+import random
+import re
+import sys
+import tempfile
+from collections.abc import Callable, Generator
+from pathlib import Path
+
+from Src.Images.FolderTools import SortToFolders
+
+CORPUS: Path = Path(__file__).with_name("SortCorpus.json")
+MIN_COUNTS: list[int] = [0, 1, 3]
+
+
+def LegacySortToFolders(p: Path, minCount: int = 1) -> Generator[str]:
+    """Sort files into folders the way the original SortToFolders did, longest name first.
+
+    Parameters
+    ----------
+    p : Path
+        folder to sort
+    minCount : int, optional
+        files a sequence needs beyond one before it gets a folder, by default 1
+
+    Yields
+    ------
+    Generator[str]
+        one message per sequence moved
+    """
+    seqs: set[str] = set()
+    for file in p.glob("*.*"):
+        if file.stem.strip()[-1].isnumeric():
+            seqs.add(" ".join(file.stem.split(" ")[:-1]))
+    seqs = set(list(seqs) + [x.name for x in p.glob("*/")])
+    for seq in sorted(seqs, key=lambda x: (-len(x), x)):
+        files: list[Path] = list(p.glob("*.*"))
+        folder = p / seq
+        if seq == p.stem:
+            continue
+        sequenceFiles = [x for x in files if re.search(rf"^{re.escape(seq)}\s?[\d+]?", x.name)]
+        if len(sequenceFiles) > minCount or folder.exists():
+            folder.mkdir(parents=True, exist_ok=True)
+            for file in sequenceFiles:
+                with contextlib.suppress(OSError):
+                    file.replace(folder / file.name)
+            if sequenceFiles:
+                yield f"{seq} -> {len(sequenceFiles)} Files"
+
+
+def RandomLayout(seed: int) -> dict[str, list[str]]:
+    """Build a flat folder layout full of overlapping sequence names.
+
+    Parameters
+    ----------
+    seed : int
+        random seed
+
+    Returns
+    -------
+    dict[str, list[str]]
+        file and folder names
+    """
+    rng = random.Random(seed)
+    words = ["cat", "cat b", "cat bat", "dog", "a.b", "x", "Cat", " cat", ""]
+    files: set[str] = set()
+    for _ in range(rng.randint(1, 30)):
+        number = rng.choice(["", f" {rng.randint(0, 30)}", str(rng.randint(0, 9)), " v1"])
+        name = f"{rng.choice(words)}{number}{rng.choice(['.jpg', '.png', '.txt'])}"
+        files.add("z" + name if name.strip(" ")[:1] == "." else name)
+    folders = [x for x in rng.sample(["cat", "dog b", "a.b", "q.r", "x 1"], 2) if x not in files]
+    return {"files": sorted(files), "folders": folders}
+
+
+def RunLayout(
+    layout: dict[str, list[str]],
+    sort: Callable[[Path, int], Generator[str]],
+    minCount: int,
+) -> dict[str, list[str]]:
+    """Sort a layout in a scratch folder.
+
+    Parameters
+    ----------
+    layout : dict[str, list[str]]
+        file and folder names
+    sort : Callable[[Path, int], Generator[str]]
+        sorting function
+    minCount : int
+        minCount passed to the sort
+
+    Returns
+    -------
+    dict[str, list[str]]
+        relative paths afterwards and the sorted messages
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        root = Path(scratch) / "Sort"
+        root.mkdir()
+        for name in layout["folders"]:
+            (root / name).mkdir()
+        for name in layout["files"]:
+            (root / name).touch()
+        messages = sorted(sort(root, minCount))
+        tree = sorted(x.relative_to(root).as_posix() for x in root.rglob("*"))
+    return {"tree": tree, "messages": messages}
+
+
+def WriteCorpus(count: int = 150) -> None:
+    """Rewrite the corpus from LegacySortToFolders.
+
+    Parameters
+    ----------
+    count : int, optional
+        number of layouts, by default 150
+    """
+    cases = []
+    for seed in range(count):
+        layout = RandomLayout(seed)
+        results = {str(x): RunLayout(layout, LegacySortToFolders, x) for x in MIN_COUNTS}
+        cases.append(layout | {"results": results})
+    CORPUS.write_text(json.dumps(cases, indent=1), encoding="utf-8")
+
+
+def CheckSortToFolders() -> None:
+    """Sort every corpus layout with SortToFolders and compare with the recorded result."""
+
+    def Sort(p: Path, minCount: int) -> Generator[str]:
+        return SortToFolders(p, simplifyFirst=False, minCount=minCount)
+
+    cases = json.loads(CORPUS.read_text(encoding="utf-8"))
+    failures = [
+        (case["files"], minCount)
+        for case in cases
+        for minCount, expected in case["results"].items()
+        if RunLayout(case, Sort, int(minCount)) != expected
+    ]
+    if failures:
+        raise AssertionError(f"{len(failures)} layouts differ, first -> {failures[0]}")
+    print(f"{len(cases) * len(MIN_COUNTS)} layouts match")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--regenerate"]:
+        WriteCorpus()
+    else:
+        CheckSortToFolders()
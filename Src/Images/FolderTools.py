@@ -1,17 +1,110 @@
 """Module to flatten and simplify directories."""
 
 import contextlib
-import re
 import shutil
-from collections.abc import Generator
+from collections import defaultdict
+from collections.abc import Callable, Generator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from stat import S_ISREG
 
-from Src.Utilities.UtilityTools import ComputeHash, DeleteFolder, GenerateUniqueName
+from Src.Utilities.DirSnapshot import RecordAdd, RecordMove, RecordRemove, Snapshot, Walk
+from Src.Utilities.HashCache import MoveHash, PruneHashes
+from Src.Utilities.Progress import CancelPending, Progress
+from Src.Utilities.UtilityTools import (
+    SAMPLE_SIZE,
+    ComputeHash,
+    ComputeSampleHash,
+    DeleteFolder,
+    GenerateUniqueName,
+    NameIndex,
+)
+
+
+def SequenceNames(names: list[str], folders: list[str]) -> set[str]:
+    """Collect candidate sequences, numbered file names without their final word and subfolders.
+
+    Parameters
+    ----------
+    names : list[str]
+        entries to sort
+    folders : list[str]
+        subfolders
+
+    Returns
+    -------
+    set[str]
+        sequence names
+    """
+    seqs: set[str] = set(folders)
+    for name in names:
+        nameStem = Path(name).stem
+        if nameStem.strip()[-1:].isnumeric():
+            seqs.add(" ".join(nameStem.split(" ")[:-1]))
+    return seqs
+
+
+def SequencePlan(
+    names: list[str],
+    folders: list[str],
+    stem: str,
+    minCount: int = 1,
+) -> list[tuple[str, list[str]]]:
+    """Group a folder listing into sequence folders without touching the filesystem.
+
+    Sequences are the names of numbered files with the final word dropped, plus every
+    existing subfolder. Each entry is indexed once under every sequence that prefixes its
+    name, then sequences are resolved longest first so a file joins the most specific one.
+
+    Parameters
+    ----------
+    names : list[str]
+        entries to sort, every name containing a dot
+    folders : list[str]
+        subfolders, each one is a sequence
+    stem : str
+        folder stem, never used as a sequence
+    minCount : int, optional
+        a new folder needs more than this many files, by default 1
+
+    Returns
+    -------
+    list[tuple[str, list[str]]]
+        sequence folder and the entries to move into it, in execution order
+    """
+    seqs = SequenceNames(names, folders)
+    members: dict[str, list[str]] = defaultdict(list)
+
+    def Index(name: str) -> None:
+        for idx in range(len(name) + 1):
+            if name[:idx] in seqs:
+                members[name[:idx]].append(name)
+
+    for name in names:
+        Index(name)
+
+    existing: set[str] = set(names) | set(folders)
+    moved: set[str] = set()
+    plan: list[tuple[str, list[str]]] = []
+    for seq in sorted(seqs, key=lambda x: (-len(x), x)):
+        if seq == stem:
+            continue
+        group = [x for x in members.pop(seq, []) if x not in moved]
+        if len(group) > minCount or not seq or seq in existing:
+            plan.append((seq, group))
+            # An empty sequence is the folder itself and a folder cannot move into itself
+            moved.update(x for x in group if seq and x != seq)
+            if seq not in existing and "." in seq:
+                Index(seq)
+            existing.add(seq)
+    return plan
 
 
 def SortToFolders(p: Path, simplifyFirst: bool, minCount: int = 1) -> Generator[str]:
     """Sort files by file name into folders (file 1, file 2, file 3 -> /file).
 
+    The folder is listed once and the moves are planned in memory by SequencePlan.
+
     Parameters
     ----------
     p : Path
@@ -27,25 +120,36 @@ def SortToFolders(p: Path, simplifyFirst: bool, minCount: int = 1) -> Generator[
     if simplifyFirst:
         yield from Simplify(p)
 
-    files: list[Path] = list(p.glob("*.*"))
-    seqs: set[str] = set()
-    for file in files:
-        if file.stem.strip()[-1].isnumeric():
-            seqs.add(" ".join(file.stem.split(" ")[:-1]))
-    seqs = set(list(seqs) + [x.name for x in p.glob("*/")])
-    for seq in seqs:
-        files: list[Path] = list(p.glob("*.*"))
+    snapshot = Snapshot(p)
+    names = [x for x in snapshot.Entries if "." in x]
+    for seq, sequenceFiles in SequencePlan(names, sorted(snapshot.Dirs), p.stem, minCount):
         folder = p / seq
-        if seq == p.stem:
-            continue
-        sequenceFiles = [x for x in files if re.search(rf"^{re.escape(seq)}\s?[\d+]?", x.name)]
-        if len(sequenceFiles) > minCount or folder.exists():
-            folder.mkdir(parents=True, exist_ok=True)
-            for file in sequenceFiles:
-                with contextlib.suppress(OSError):
-                    file.replace(folder / file.name)
-            if sequenceFiles:
-                yield f"{seq} -> {len(sequenceFiles)} Files"
+        folder.mkdir(parents=True, exist_ok=True)
+        RecordAdd(folder, isDir=True)
+        for name in sequenceFiles:
+            with contextlib.suppress(OSError):
+                (p / name).replace(folder / name)
+                RecordMove(p / name, folder / name)
+        if sequenceFiles:
+            yield f"{seq} -> {len(sequenceFiles)} Files"
+
+
+def FlattenFile(src: Path, dst: Path, delete: bool) -> None:
+    """Move or copy one file to its planned place in the top folder.
+
+    Parameters
+    ----------
+    src : Path
+        file in a subfolder
+    dst : Path
+        reserved path in the top folder
+    delete : bool
+        true to move the file, false to copy it
+    """
+    if delete:
+        src.rename(dst)
+    else:
+        shutil.copyfile(src, dst)
 
 
 def Flatten(
@@ -53,9 +157,13 @@ def Flatten(
     rename: bool = False,
     delete: bool = False,
     globPattern: str = "**/*.*",
-) -> Generator[str]:
+    workers: int = 8,
+) -> Generator[str | Progress]:
     """Flatten a nested pattern of folders.
 
+    The tree is walked once up front and every destination is chosen before any file is
+    touched, then the copies or moves run on a thread pool so slow destinations overlap.
+
     Parameters
     ----------
     p : Path
@@ -66,60 +174,290 @@ def Flatten(
         true if files are to be deleted, by default False
     globPattern : str, optional
         glob matching pattern, by default "**/*.*"
+    workers : int, optional
+        number of files copied or moved at once, by default 8
 
     Yields
     ------
-    Generator[str]
-        status strings
+    Generator[str | Progress]
+        progress with bytes moved, errors, then a summary
     """
-    for folder in p.glob(globPattern):
-        if folder.parent != p:
-            dst: Path = p / f"{folder.parent.stem + ' ' if rename else ''}{folder.name}"
-            while dst.exists():
-                dst = dst.parent / f"{dst.stem} (1){dst.suffix}"
-            if delete:
-                folder.rename(dst)
-            else:
-                shutil.copyfile(str(folder), str(dst))
+    index = NameIndex(p)
+    plan: dict[Path, tuple[Path, int]] = {}
+    for snapshot in Walk(p):
+        if snapshot.Folder == p:
+            continue
+        for file in snapshot.Files():
+            stat = snapshot.Stat(file.name)
+            if S_ISREG(stat.st_mode) and file.relative_to(p).full_match(globPattern):
+                dst = index.Unique(f"{file.parent.stem + ' ' if rename else ''}{file.name}")
+                plan[file] = (dst, stat.st_size)
+
+    moved = 0
+    movedBytes = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(FlattenFile, file, dst, delete): file for file, (dst, _) in plan.items()
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                file = futures[future]
+                try:
+                    future.result()
+                    if delete:
+                        RecordMove(file, plan[file][0])
+                    else:
+                        RecordAdd(plan[file][0])
+                    moved += 1
+                    movedBytes += plan[file][1]
+                except OSError as e:
+                    failed += 1
+                    yield f"Error {e} -> {file}"
+                yield Progress(done, len(plan), movedBytes, file.name)
+        finally:
+            CancelPending(pool)
+
+    removed = 0
     if delete and globPattern in ["**/*.*"]:
-        for folder in p.glob("**/*/"):
-            DeleteFolder(folder)
-    yield f"{len(list(p.glob(globPattern)))} Files moved to {p.name}" + (
-        f"\n{len(list(p.glob('**/*/')))} Folders Removed" if delete else ""
+        if failed:
+            # The subfolders still hold the files that could not be moved
+            yield f"Kept subfolders, {failed} files were not moved"
+        else:
+            removed = sum(DeleteFolder(x) for x in Snapshot(p).Folders())
+    yield f"{moved} Files moved to {p.name} ({movedBytes / 1024**2:.1f} MB)" + (
+        f"\n{removed} Folders Removed" if delete else ""
     )
 
 
 def AllEqualFiles(folder: Path) -> bool:
-    """Determine if all files in a folder are the same."""
+    """Determine if all files in a folder are the same.
+
+    Files are compared by size, then by a head and tail sample, and only then by a full
+    content hash, stopping at the first file that differs.
+    """
     if not folder:
         return False
-    files = [p for p in folder.iterdir() if p.is_file()]
+    # Sizes are read fresh, a file rewritten in place leaves the folder mtime alone
+    sizes: dict[Path, int] = {}
+    for p in Snapshot(folder).Files():
+        with contextlib.suppress(OSError):
+            if S_ISREG((stat := p.lstat()).st_mode):
+                sizes[p] = stat.st_size
+    files = list(sizes)
 
     if len(files) <= 1:
         return True
 
+    size = sizes[files[0]]
+    if any(sizes[other] != size for other in files[1:]):
+        return False
+
+    firstSample = ComputeSampleHash(files[0])
+    if any(ComputeSampleHash(other) != firstSample for other in files[1:]):
+        return False
+    if size <= 2 * SAMPLE_SIZE:
+        return True
+
     firstHash = ComputeHash(files[0])
     return all(ComputeHash(other) == firstHash for other in files[1:])
 
 
 def Simplify(inputPath: Path) -> Generator[str]:
     """Reduce folder structure in directory."""
-    folderList: list[Path] = [x for x in inputPath.glob("*") if x.is_dir() and x.stem[0] != "_"]
+    folderList: list[Path] = [x for x in Snapshot(inputPath).Folders() if x.stem[0] != "_"]
+    index = NameIndex(inputPath)
     for dirPath in folderList:
-        files: list[Path] = list(dirPath.glob("*.*"))
+        files: list[Path] = Snapshot(dirPath).Glob("*.*")
         if files and AllEqualFiles(dirPath):
             masterFile: Path = files[0]
             dst: Path = dirPath.parent / f"{dirPath.name}{masterFile.suffix}"
-            if dst.exists() and ComputeHash(masterFile) == ComputeHash(dst):
+            if dst.name in index and ComputeHash(masterFile) == ComputeHash(dst):
                 pass
-            elif not dst.exists():
-                masterFile.rename(dst)
             else:
-                dst: Path = GenerateUniqueName(
-                    dirPath.parent / f"{dirPath.name}{masterFile.suffix}",
-                )
+                dst = GenerateUniqueName(dst, index)
                 masterFile.rename(dst)
-                # raise FileExistsError(masterFile, dst)
+                RecordMove(masterFile, dst)
+                MoveHash(masterFile, dst)
             if not DeleteFolder(dirPath):
                 yield (f"Could not delete -> {dirPath}")
+            index.Remove(dirPath.name)
+            PruneHashes(dirPath)
     yield "Simplify Complete"
+
+
+def SizeBuckets(p: Path) -> dict[int, list[Path]]:
+    """Group every non-empty file in a tree by size, counting hardlinks once.
+
+    Parameters
+    ----------
+    p : Path
+        root folder
+
+    Returns
+    -------
+    dict[int, list[Path]]
+        size -> files of that size, only sizes shared by more than one file
+    """
+    buckets: dict[int, list[Path]] = defaultdict(list)
+    seenInodes: set[tuple[int, int]] = set()
+    for snapshot in Walk(p):
+        for file in snapshot.Files():
+            # Not the snapshot's stat, which predates any in-place rewrite since
+            try:
+                stat = file.lstat()
+            except OSError:
+                continue
+            if not S_ISREG(stat.st_mode):
+                continue
+            if stat.st_ino and stat.st_nlink > 1:
+                if (stat.st_dev, stat.st_ino) in seenInodes:
+                    continue
+                seenInodes.add((stat.st_dev, stat.st_ino))
+            if stat.st_size:
+                buckets[stat.st_size].append(file)
+    return {size: files for size, files in buckets.items() if len(files) > 1}
+
+
+def SplitByDigest(
+    pool: ThreadPoolExecutor,
+    groups: list[list[Path]],
+    hashFunc: Callable[[Path], bytes],
+) -> tuple[list[list[Path]], list[str]]:
+    """Split candidate groups by a digest, keeping only groups that still collide.
+
+    A file that cannot be read is dropped from its group and reported, the rest of the
+    group is still compared.
+
+    Parameters
+    ----------
+    pool : ThreadPoolExecutor
+        pool to hash files on
+    groups : list[list[Path]]
+        candidate groups, files within a group have the same size
+    hashFunc : Callable[[Path], bytes]
+        digest function
+
+    Returns
+    -------
+    tuple[list[list[Path]], list[str]]
+        refined groups, and an error string per file that could not be hashed
+    """
+
+    def Digest(file: Path) -> bytes | OSError:
+        try:
+            return hashFunc(file)
+        except OSError as e:
+            return e
+
+    files = [file for group in groups for file in group]
+    digests = dict(zip(files, pool.map(Digest, files), strict=True))
+    errors = [f"Error {x} -> {file}" for file, x in digests.items() if isinstance(x, OSError)]
+    refined: list[list[Path]] = []
+    for group in groups:
+        byDigest: dict[bytes, list[Path]] = defaultdict(list)
+        for file in group:
+            if isinstance(digest := digests[file], bytes):
+                byDigest[digest].append(file)
+        refined += [x for x in byDigest.values() if len(x) > 1]
+    return refined, errors
+
+
+def ResolveDuplicates(group: list[Path], resolution: str) -> Generator[str]:
+    """Keep the shallowest file of a duplicate group and hardlink or delete the rest.
+
+    Parameters
+    ----------
+    group : list[Path]
+        identical files
+    resolution : str
+        Report, Hardlink or Delete
+
+    Yields
+    ------
+    Generator[str]
+        status strings
+    """
+    keep, *extras = sorted(group, key=lambda x: (len(x.parts), str(x)))
+    yield f"{keep} <- {', '.join(str(x) for x in extras)}"
+    for extra in extras:
+        try:
+            if resolution == "Hardlink":
+                tmp = extra.with_name(f".{extra.name}.link")
+                tmp.hardlink_to(keep)
+                tmp.replace(extra)
+                RecordAdd(extra)
+            elif resolution == "Delete":
+                extra.unlink()
+                RecordRemove(extra)
+        except OSError as e:
+            yield f"Error {e} -> {extra}"
+
+
+def FindDuplicates(
+    p: Path,
+    resolution: str = "Report",
+    workers: int = 8,
+    batchSize: int = 256,
+) -> Generator[str | Progress]:
+    """Find identical files anywhere below a folder.
+
+    Candidates are narrowed by size, then a head and tail sample, then a full hash. Size
+    buckets are hashed in batches on a thread pool so reads overlap, and digests are only
+    held for the current batch.
+
+    Parameters
+    ----------
+    p : Path
+        root folder
+    resolution : str, optional
+        Report, Hardlink or Delete, by default "Report"
+    workers : int, optional
+        number of hashing threads, by default 8
+    batchSize : int, optional
+        files hashed per batch, by default 256
+
+    Yields
+    ------
+    Generator[str | Progress]
+        each duplicate group as it is confirmed, progress per batch, then a summary
+    """
+    buckets = SizeBuckets(p)
+    groupCount = 0
+    extraCount = 0
+    wasted = 0
+    total = sum(len(x) for x in buckets.values())
+    checked = 0
+    checkedBytes = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        batch: list[list[Path]] = []
+        sizeOf: dict[Path, int] = {}
+        sizes = sorted(buckets, reverse=True)
+        for idx, size in enumerate(sizes):
+            batch.append(buckets.pop(size))
+            sizeOf.update(dict.fromkeys(batch[-1], size))
+            checked += len(batch[-1])
+            checkedBytes += len(batch[-1]) * size
+            if sum(len(x) for x in batch) < batchSize and idx < len(sizes) - 1:
+                continue
+            # Samples cover small files whole, only larger ones need the full hash
+            groups: list[list[Path]] = []
+            large: list[list[Path]] = []
+            sampled, errors = SplitByDigest(pool, batch, ComputeSampleHash)
+            yield from errors
+            for group in sampled:
+                (large if sizeOf[group[0]] > 2 * SAMPLE_SIZE else groups).append(group)
+            hashed, errors = SplitByDigest(pool, large, ComputeHash)
+            yield from errors
+            for group in groups + hashed:
+                groupCount += 1
+                extraCount += len(group) - 1
+                wasted += (len(group) - 1) * sizeOf[group[0]]
+                yield from ResolveDuplicates(group, resolution)
+            batch = []
+            sizeOf = {}
+            yield Progress(checked, total, checkedBytes)
+    yield (
+        f"{groupCount} duplicate groups, {extraCount} redundant files "
+        f"({wasted / 1024**2:.1f} MB) -> {resolution}"
+    )
@@ -1,14 +1,143 @@
 """Decomposing files into composite parts."""
 
+import csv
 import itertools
-from collections.abc import Generator
+from collections import defaultdict
+from collections.abc import Generator, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from io import BytesIO
 from pathlib import Path
-
-from cv2 import CAP_PROP_FPS, CAP_PROP_FRAME_COUNT, CAP_PROP_POS_FRAMES, VideoCapture, imwrite
-from pdf2image import convert_from_path
+from threading import BoundedSemaphore
+
+import numpy as np
+from cv2 import (
+    CAP_PROP_FPS,
+    CAP_PROP_FRAME_COUNT,
+    CAP_PROP_POS_FRAMES,
+    COLOR_BGR2GRAY,
+    INTER_AREA,
+    VideoCapture,
+    cvtColor,
+    imwrite,
+    resize,
+)
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
+from pypdf import PageObject, PdfReader
+from pypdf.generic import ContentStream, StreamObject
+
+from Src.Utilities.DirSnapshot import Invalidate, Snapshot, Walk
+from Src.Utilities.FolderWatch import WatchedIndex
+from Src.Utilities.Progress import CancelPending, Progress
+from Src.Utilities.UtilityTools import GetAllVideos, SplitFrameName
+
+PAINT_OPS: set[bytes] = {
+    b"f",
+    b"F",
+    b"f*",
+    b"S",
+    b"s",
+    b"B",
+    b"B*",
+    b"b",
+    b"b*",
+    b"sh",
+    b"BI",
+    b"INLINE IMAGE",
+    b"Tj",
+    b"TJ",
+    b"'",
+    b'"',
+}
+
+
+def GrabFrames(
+    video: VideoCapture,
+    startFrame: int,
+    endFrame: int,
+    step: float,
+) -> Generator[tuple[int, np.ndarray]]:
+    """Read every step-th frame of a video, grabbing the frames in between without decoding.
+
+    Parameters
+    ----------
+    video : VideoCapture
+        open video positioned at startFrame
+    startFrame : int
+        first frame number
+    endFrame : int
+        last frame number
+    step : float
+        frames between samples, fractional steps are rounded per frame
+
+    Yields
+    ------
+    Generator[tuple[int, np.ndarray]]
+        frame number and frame
+    """
+    frameNum: int = startFrame
+    nextFrame: float = startFrame
+    while frameNum <= endFrame:
+        if frameNum >= round(nextFrame):
+            ret, frame = video.read()
+            if not ret:
+                break
+            yield frameNum, frame
+            nextFrame += step
+        elif not video.grab():
+            break
+        frameNum += 1
+
 
-from Src.Utilities.UtilityTools import DigitizeStr, GetAllVideos
+def SeekFrames(video: VideoCapture, frameNums: list[int]) -> Generator[tuple[int, np.ndarray]]:
+    """Read specific frames of a video, seeking between them.
+
+    Parameters
+    ----------
+    video : VideoCapture
+        open video
+    frameNums : list[int]
+        frame numbers to read
+
+    Yields
+    ------
+    Generator[tuple[int, np.ndarray]]
+        frame number and frame
+    """
+    for frameNum in sorted(set(frameNums)):
+        video.set(CAP_PROP_POS_FRAMES, frameNum)
+        ret, frame = video.read()
+        if ret:
+            yield frameNum, frame
+
+
+def SceneChanges(
+    frames: Iterable[tuple[int, np.ndarray]],
+    threshold: float,
+) -> Generator[tuple[int, np.ndarray]]:
+    """Drop frames that are near duplicates of the last kept frame.
+
+    Frames are compared as 64x36 greyscale thumbnails by mean absolute difference.
+
+    Parameters
+    ----------
+    frames : Iterable[tuple[int, np.ndarray]]
+        frame numbers and frames
+    threshold : float
+        minimum mean difference (0-255) from the last kept frame
+
+    Yields
+    ------
+    Generator[tuple[int, np.ndarray]]
+        frame number and frame of each kept frame
+    """
+    previous: np.ndarray | None = None
+    for frameNum, frame in frames:
+        thumb = resize(cvtColor(frame, COLOR_BGR2GRAY), (64, 36), interpolation=INTER_AREA)
+        thumb = thumb.astype(np.int16)
+        if previous is None or np.abs(thumb - previous).mean() >= threshold:
+            previous = thumb
+            yield frameNum, frame
 
 
 def DecompileVideo(
@@ -16,9 +145,21 @@ def DecompileVideo(
     startTime: float = -1,
     endTime: float = -1,
     makeSubDir: bool = True,
-) -> Generator[str]:
+    writers: int = 4,
+    queueSize: int = 32,
+    stride: int = 1,
+    targetFps: float = 0,
+    timestamps: list[float] | None = None,
+    sceneThreshold: float = 0,
+) -> Generator[str | Progress]:
     """Convert a video section to png sequence.
 
+    Frames are decoded on the calling thread and handed to a pool of writer threads for
+    encoding, with at most queueSize frames waiting at once. Skipped frames are grabbed
+    without being decoded, explicit timestamps are sought to directly. With a scene
+    threshold only frames that differ from the last kept frame are written, and the kept
+    frames are listed in a csv next to them.
+
     Parameters
     ----------
     inputPath : Path
@@ -29,17 +170,30 @@ def DecompileVideo(
         end of clip
     makeSubDir: bool
         create subdirectory for images
+    writers : int
+        number of encoding threads
+    queueSize : int
+        maximum number of decoded frames waiting to be written
+    stride : int
+        keep every Nth frame
+    targetFps : float
+        keep frames at this rate instead of a fixed stride, 0 to disable
+    timestamps : list[float] | None
+        exact times in seconds to extract, overrides the other sampling options
+    sceneThreshold : float
+        minimum mean difference (0-255) between kept frames, 0 to keep every frame
 
     Yields
     ------
-    Generator[str]
-        status string
+    Generator[str | Progress]
+        progress through the clip, then a status string per video
     """
     vidList = GetAllVideos(inputPath)
     for videoPath in vidList:
         dst = (inputPath / videoPath.stem) if makeSubDir else videoPath.parent
         if not dst.exists():
             dst.mkdir(parents=True)
+            Invalidate(dst.parent)
 
         # Capture the video
         video = VideoCapture(videoPath)
@@ -47,91 +201,423 @@ def DecompileVideo(
         # Check if the video opened successfully
         if not video.isOpened():
             yield (f"Error: Could not open video {videoPath}.")
+            continue
 
         fps: int = video.get(CAP_PROP_FPS)
+        if fps <= 0 and (timestamps or targetFps > 0 or startTime > 0 or endTime > 0):
+            # Some containers carry no frame rate, times cannot be mapped to frames
+            video.release()
+            yield f"Error: {videoPath.name} reports no frame rate, extract by stride instead"
+            continue
         startFrame: int = int(startTime * fps) if startTime > 0 else 0
         endFrame: int = int(endTime * fps) if endTime > 0 else video.get(CAP_PROP_FRAME_COUNT)
 
-        video.set(CAP_PROP_POS_FRAMES, startFrame)
+        if timestamps:
+            frames = SeekFrames(video, [round(x * fps) for x in timestamps])
+        else:
+            video.set(CAP_PROP_POS_FRAMES, startFrame)
+            step = fps / targetFps if targetFps > 0 else max(stride, 1)
+            frames = GrabFrames(video, startFrame, endFrame, step)
+        if sceneThreshold > 0:
+            frames = SceneChanges(frames, sceneThreshold)
+
+        slots = BoundedSemaphore(queueSize)
+        futures: list[Future] = []
+        frameNums: list[int] = []
+        total = len(timestamps) if timestamps else max(int(endFrame) - startFrame, 1)
+        try:
+            with ThreadPoolExecutor(max_workers=writers) as pool:
+                for frameNum, frame in frames:
+                    slots.acquire()
+                    framePath = dst / f"{videoPath.stem} {frameNum:04d}.jpg"
+                    future = pool.submit(imwrite, str(framePath), frame)
+                    future.add_done_callback(lambda _, release=slots.release: release())
+                    futures.append(future)
+                    frameNums.append(frameNum)
+                    done = len(frameNums) if timestamps else frameNum - startFrame + 1
+                    yield Progress(min(done, total), total, Item=videoPath.name)
+        finally:
+            video.release()
+        if sceneThreshold > 0:
+            with (dst / f"{videoPath.stem} scenes.csv").open("w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame", "timestamp"])
+                writer.writerows([x, round(x / fps, 3) if fps > 0 else ""] for x in frameNums)
+        failed = sum(not x.result() for x in futures)
+        # Frames bypass the snapshots, a watched folder would otherwise look unchanged
+        Invalidate(dst)
+        yield f"Extracted {len(futures) - failed} frames to {dst}" + (
+            f", {failed} failed" if failed else ""
+        )
+    if not vidList:
+        yield "No video files found"
 
-        frameNum: int = startFrame
-        while frameNum <= endFrame:
-            ret, frame = video.read()
-            if not ret:
-                break
 
-            imwrite(dst / f"{videoPath.stem} {frameNum:04d}.jpg", frame)
-            frameNum += 1
+def ConcatMatrix(cm: list[float], ctm: list[float]) -> list[float]:
+    """Concatenate a cm operator's matrix onto the current transformation matrix."""
+    a1, b1, c1, d1, e1, f1 = cm
+    a2, b2, c2, d2, e2, f2 = ctm
+    return [
+        a1 * a2 + b1 * c2,
+        a1 * b2 + b1 * d2,
+        c1 * a2 + d1 * c2,
+        c1 * b2 + d1 * d2,
+        e1 * a2 + f1 * c2 + e2,
+        e1 * b2 + f1 * d2 + f2,
+    ]
 
-        video.release()
-        yield f"Extracted {endFrame - startFrame} frames to {dst}"
-    if not vidList:
-        yield "No video files found"
 
+def ImageTransform(contents: ContentStream, name: str) -> list[float] | None:
+    """Find the transformation matrix an image is drawn with.
+
+    Parameters
+    ----------
+    contents : ContentStream
+        page content stream
+    name : str
+        resource name of the image
+
+    Returns
+    -------
+    list[float] | None
+        matrix of the only Do operator, None if anything else is painted
+    """
+    matrix = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+    stack: list[list[float]] = []
+    drawn: list[float] | None = None
+    for operands, operator in contents.operations:
+        if operator == b"q":
+            stack.append(matrix)
+        elif operator == b"Q" and stack:
+            matrix = stack.pop()
+        elif operator == b"cm":
+            matrix = ConcatMatrix([float(x) for x in operands], matrix)
+        elif operator == b"Do":
+            if drawn is not None or operands[0] != name:
+                return None
+            drawn = matrix
+        elif operator in PAINT_OPS:
+            return None
+    return drawn
+
+
+def FullBleedImage(page: PageObject) -> StreamObject | None:
+    """Find the image XObject of a page that is nothing but one image covering the page.
+
+    Parameters
+    ----------
+    page : PageObject
+        pdf page
+
+    Returns
+    -------
+    StreamObject | None
+        the image, None if the page draws anything else or the image does not cover it
+    """
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    contents = page.get_contents()
+    if not xobjects or contents is None or page.rotation % 360:
+        return None
+    xobjects = xobjects.get_object()
+    if len(xobjects) != 1:
+        return None
+    name, ref = next(iter(xobjects.items()))
+    image = ref.get_object()
+    if image.get("/Subtype") != "/Image" or "/SMask" in image or "/Mask" in image:
+        return None
+    drawn = ImageTransform(contents, name)
+    if drawn is None:
+        return None
+
+    a, b, c, d, e, f = drawn
+    x0, y0, x1, y1 = (float(x) for x in page.mediabox)
+    tolerance = 0.01 * max(x1 - x0, y1 - y0)
+    covers = (
+        abs(b) <= tolerance
+        and abs(c) <= tolerance
+        and abs(abs(a) - (x1 - x0)) <= tolerance
+        and abs(abs(d) - (y1 - y0)) <= tolerance
+        and abs(min(e, e + a) - x0) <= tolerance
+        and abs(min(f, f + d) - y0) <= tolerance
+    )
+    return image if covers else None
+
+
+def ExtractPageImage(page: PageObject, stem: Path) -> bool:
+    """Write the full bleed image of a page in its native encoding.
+
+    JPEG and JPEG 2000 streams are written untouched, other encodings are decoded and
+    saved as png.
+
+    Parameters
+    ----------
+    page : PageObject
+        pdf page
+    stem : Path
+        output path without extension
+
+    Returns
+    -------
+    bool
+        false if the page is not a single full bleed image, or its image cannot be
+        decoded, and needs rendering
+    """
+    # Decoding fails for filters pypdf lacks, JBIG2 and some CCITT, poppler renders those
+    try:
+        image = FullBleedImage(page)
+        if image is None:
+            return False
+        filters = image.get("/Filter")
+        filters = [filters] if isinstance(filters, str) else list(filters or [])
+        if filters in (["/DCTDecode"], ["/JPXDecode"]) and "/Decode" not in image:
+            data = image.get_data()
+            if filters == ["/JPXDecode"]:
+                stem.with_suffix(".jp2").write_bytes(data)
+                return True
+            with Image.open(BytesIO(data)) as im:
+                if im.mode in {"L", "RGB"}:
+                    stem.with_suffix(".jpg").write_bytes(data)
+                    return True
+            return False
+        pageImage = page.images[0].image
+        if pageImage is None or pageImage.mode not in {"1", "L", "LA", "P", "RGB", "RGBA"}:
+            return False
+        pageImage.save(stem.with_suffix(".png"))
+        return True
+    except Exception:
+        return False
+
+
+def RenderPDF(
+    pdf: Path,
+    makeSubdir: bool,
+    dpi: int,
+    height: int | None,
+    batchSize: int,
+    threads: int,
+    extractImages: bool = False,
+) -> str:
+    """Render one pdf to a png sequence in page range batches.
+
+    With extractImages, pages that are a single full bleed image have that image written
+    out directly and only the remaining pages are rendered.
 
-def DecompilePDF(inputPath: Path, makeSubdir: bool) -> Generator[str]:
+    Parameters
+    ----------
+    pdf : Path
+        pdf file
+    makeSubdir : bool
+        render into a folder named after the pdf
+    dpi : int
+        render resolution
+    height : int | None
+        render pages straight to this pixel height instead of using dpi
+    batchSize : int
+        pages rendered per poppler call
+    threads : int
+        poppler threads per batch
+    extractImages : bool, optional
+        extract embedded page images instead of rendering where possible
+
+    Returns
+    -------
+    str
+        status string
+    """
+    if makeSubdir:
+        dst = Path(str(pdf).replace(".pdf", ""))
+        if dst.exists():
+            dst = dst.parent / (dst.name + " PDF")
+            dst.mkdir(exist_ok=True)
+        else:
+            dst.mkdir()
+        Invalidate(dst.parent)
+    else:
+        dst = pdf.parent
+
+    outputFile = f"{dst.name.replace(' PDF', '')} "
+    # One render per pdf used to name everything "<name> 0001-<page>", keep that prefix for
+    # every batch and thread, pdftoppm adds the absolute page number itself
+    pagePrefix = f"{outputFile}0001"
+    extracted: int = 0
+    if extractImages:
+        reader = PdfReader(pdf)
+        pageCount: int = len(reader.pages)
+        renderPages: list[int] = []
+        for pageNum, page in enumerate(reader.pages, start=1):
+            # Named like the rendered pages, which pdftoppm pads to the page count
+            if ExtractPageImage(page, dst / f"{pagePrefix}-{pageNum:0{len(str(pageCount))}d}"):
+                extracted += 1
+            else:
+                renderPages.append(pageNum)
+    else:
+        pageCount: int = pdfinfo_from_path(pdf)["Pages"]
+        renderPages: list[int] = list(range(1, pageCount + 1))
+
+    for first, last in Ranges(renderPages):
+        for firstPage in range(first, last + 1, batchSize):
+            convert_from_path(
+                pdf_path=pdf,
+                dpi=dpi,
+                size=(None, height) if height else None,
+                first_page=firstPage,
+                last_page=min(firstPage + batchSize - 1, last),
+                thread_count=threads,
+                paths_only=True,
+                fmt="png",
+                output_file=(pagePrefix for _ in itertools.count()),
+                output_folder=dst,
+            )
+
+    # Written by poppler, not recorded in the snapshot
+    Invalidate(dst)
+    return f"{dst.parent.name}\\{dst.name}" + (
+        f" ({extracted} extracted, {len(renderPages)} rendered)" if extractImages else ""
+    )
+
+
+def DecompilePDF(
+    inputPath: Path,
+    makeSubdir: bool,
+    dpi: int = 200,
+    height: int | None = None,
+    batchSize: int = 50,
+    threads: int = 4,
+    workers: int = 2,
+    extractImages: bool = False,
+) -> Generator[str | Progress]:
     """Convert pdf files to png sequences.
 
+    Pages are rendered to disk in batches without being loaded back into memory, and
+    several pdfs are rendered at once.
+
     Parameters
     ----------
     inputPath : Path
         pdf file or path to folder of pdf files
+    makeSubdir : bool
+        render each pdf into a folder named after it
+    dpi : int, optional
+        render resolution, by default 200
+    height : int | None, optional
+        render pages straight to this pixel height instead of using dpi, by default None
+    batchSize : int, optional
+        pages rendered per poppler call, by default 50
+    threads : int, optional
+        poppler threads per pdf, by default 4
+    workers : int, optional
+        pdfs rendered at once, by default 2
+    extractImages : bool, optional
+        write embedded page images out as is where a page is a single image, by default False
 
     Yields
     ------
-    Generator[str]
-        status string
+    Generator[str | Progress]
+        status string and progress per pdf
     """
-    pdfList: list[Path] = list(inputPath.glob("*.pdf")) if inputPath.is_dir() else [inputPath]
-
-    for pdf in pdfList:
-        if makeSubdir:
-            dst = Path(str(pdf).replace(".pdf", ""))
-            if dst.exists():
-                dst = dst.parent / (dst.name + " PDF")
-                dst.mkdir(exist_ok=True)
-            else:
-                dst.mkdir()
-        else:
-            dst = pdf.parent
-
-        _pages = convert_from_path(
-            pdf_path=pdf,
-            fmt="png",
-            output_file=f"{dst.name.replace(' PDF', '')} ",
-            output_folder=dst,
-        )
-
-        yield f"{dst.parent.name}\\{dst.name}"
+    pdfList: list[Path] = Snapshot(inputPath).Glob("*.pdf") if inputPath.is_dir() else [inputPath]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                RenderPDF,
+                pdf,
+                makeSubdir,
+                dpi,
+                height,
+                batchSize,
+                threads,
+                extractImages,
+            ): pdf
+            for pdf in pdfList
+        }
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield f"Error {e} -> {futures[future].name}"
+                yield Progress(done, len(pdfList), Item=futures[future].name)
+        finally:
+            CancelPending(pool)
     if not pdfList:
         yield "No .pdf files found"
 
 
-def DecompileGIF(inputPath: Path, renderToSubDir: bool = False) -> Generator[str]:
+def DecompileGIF(
+    inputPath: Path,
+    renderToSubDir: bool = False,
+    workers: int = 4,
+    compressLevel: int = 6,
+    skipDuplicates: bool = False,
+) -> Generator[str | Progress]:
     """Convert a GIF file to a sequence of png.
 
+    Frames are composited in order on the calling thread, then copies are handed to a pool
+    of threads for png encoding.
+
     Parameters
     ----------
     inputPath : Path
         gif file or directory of gif files
     renderToSubDir : bool, optional
         should the output be grouped to a subdir, by default False
+    workers : int, optional
+        number of encoding threads, by default 4
+    compressLevel : int, optional
+        png compression level from 0 (fastest) to 9 (smallest), by default 6
+    skipDuplicates : bool, optional
+        skip frames identical to the previous frame, by default False
 
     Yields
     ------
-    Generator[str]
-        status string
+    Generator[str | Progress]
+        progress per frame, then a status string per gif
     """
-    gifList: list[Path] = list(inputPath.glob("*.gif")) if inputPath.is_dir() else [inputPath]
+    gifList: list[Path] = Snapshot(inputPath).Glob("*.gif") if inputPath.is_dir() else [inputPath]
     for path in gifList:
-        print(path)
-        imageObject: Image.Image = Image.open(path)
         parentDir: Path = path.parent / path.stem if renderToSubDir else path.parent
-        parentDir.mkdir(exist_ok=True)
-        for frame in range(imageObject.n_frames):  # pyright: ignore[reportAttributeAccessIssue]
-            imageObject.seek(frame)
-            imageObject.save(parentDir / f"{path.stem} {frame:03d}.png")
-        yield f"Rendered {imageObject.n_frames} frames to {parentDir}"  # pyright: ignore[reportAttributeAccessIssue]
+        if renderToSubDir:
+            parentDir.mkdir(exist_ok=True)
+            Invalidate(path.parent)
+        slots = BoundedSemaphore(workers * 4)
+        futures: dict[Future, Path] = {}
+        skipped: int = 0
+        with Image.open(path) as imageObject, ThreadPoolExecutor(max_workers=workers) as pool:
+            previous: bytes | None = None
+            frameCount: int = imageObject.n_frames  # pyright: ignore[reportAttributeAccessIssue]
+            for frame in range(frameCount):
+                yield Progress(frame + 1, frameCount, Item=path.name)
+                imageObject.seek(frame)
+                if skipDuplicates:
+                    current = imageObject.mode.encode() + imageObject.tobytes()
+                    if current == previous:
+                        skipped += 1
+                        continue
+                    previous = current
+
+                slots.acquire()
+                framePath = parentDir / f"{path.stem} {frame:03d}.png"
+                future = pool.submit(
+                    imageObject.copy().save,
+                    framePath,
+                    compress_level=compressLevel,
+                )
+                future.add_done_callback(lambda _, release=slots.release: release())
+                futures[future] = framePath
+
+        failed: int = 0
+        for future, framePath in futures.items():
+            if error := future.exception():
+                failed += 1
+                yield f"Error {error} -> {framePath.name}"
+        Invalidate(parentDir)
+        yield (
+            f"Rendered {len(futures) - failed} frames to {parentDir}"
+            + (f", {skipped} duplicates skipped" if skipped else "")
+            + (f", {failed} failed" if failed else "")
+        )
     if not gifList:
         yield "No .gif files found"
 
@@ -142,30 +628,91 @@ def Ranges(i: list[int]) -> Generator[tuple[int, int]]:
         yield b[0][1], b[-1][1]
 
 
-def CheckSequence(filePath: Path) -> list:
-    fileNums: set[int] = set()
-    for file in [x for x in filePath.glob("**/*") if isinstance(x, Path)]:
-        fileNums.add(DigitizeStr(inString=file.stem))
-    numList: list[int] = sorted(fileNums)
+def ScanSeries(path: Path) -> tuple[dict[str, list[int]], int]:
+    """Group every file below a folder into numbered series from its snapshots.
+
+    Names are split by SplitFrameName and the folder each file sits in is part of its
+    series label, so several series can share a folder.
+
+    Parameters
+    ----------
+    path : Path
+        root folder
+
+    Returns
+    -------
+    tuple[dict[str, list[int]], int]
+        series label -> frame numbers, and the number of files without any digits
+    """
+    series: dict[str, list[int]] = defaultdict(list)
+    unnumbered = 0
+    for snapshot in Walk(path):
+        folder = snapshot.Folder
+        prefix = "" if folder == path else f"{folder.relative_to(path).as_posix()}/"
+        for name in list(snapshot.Entries):
+            if name in snapshot.Dirs:
+                continue
+            if frame := SplitFrameName(name):
+                series[prefix + frame[0]].append(frame[1])
+            else:
+                unnumbered += 1
+    return series, unnumbered
+
 
-    prevVal: int = numList[0]
-    missingVals: list[int] = []
-    for num in numList[1:]:
-        if prevVal != num - 1:
-            missingVals += range(prevVal + 1, num)
-        prevVal = num
-    return list(Ranges(missingVals))
+def SequenceGaps(frames: Iterable[int]) -> tuple[int, int, list[tuple[int, int]]]:
+    """Find the missing ranges of a series from the steps between its sorted frames.
+
+    Parameters
+    ----------
+    frames : Iterable[int]
+        frame numbers, in any order and possibly repeated
+
+    Returns
+    -------
+    tuple[int, int, list[tuple[int, int]]]
+        first frame, last frame and the inclusive missing ranges
+    """
+    ordered = np.unique(np.asarray(list(frames)))
+    breaks = np.flatnonzero(np.diff(ordered) > 1)
+    missing = [(int(ordered[x]) + 1, int(ordered[x + 1]) - 1) for x in breaks]
+    return int(ordered[0]), int(ordered[-1]), missing
+
+
+def CheckSequence(filePath: Path) -> dict[str, tuple[int, int, list[tuple[int, int]]]]:
+    """Check every series below a folder for missing frames.
+
+    Parameters
+    ----------
+    filePath : Path
+        root folder
+
+    Returns
+    -------
+    dict[str, tuple[int, int, list[tuple[int, int]]]]
+        series label -> first frame, last frame and missing ranges, for series of more than
+        one file
+    """
+    series, _ = ScanSeries(filePath)
+    return {
+        label: SequenceGaps(frames) for label, frames in sorted(series.items()) if len(frames) > 1
+    }
 
 
 def CheckSeq(path: Path) -> Generator[str]:
-    missing = CheckSequence(path)
-    if missing:
-        missingList = [f"{x[0]} to {x[1]}" if x[0] != x[1] else str(x[0]) for x in missing]
-        outStr = f"Missing {', '.join(missingList)}"
-    else:
-        fileNums: set[int] = set()
-        for file in [x for x in path.glob("**/*") if isinstance(x, Path)]:
-            fileNums.add(DigitizeStr(inString=file.stem))
-        numList: list[int] = sorted(fileNums)
-        outStr = f"Complete Sequence from {numList[0]}-{numList[-1]}"
-    yield outStr
+    index = WatchedIndex(path)
+    series, unnumbered = index.Series(path) if index else ScanSeries(path)
+    singles = 0
+    for label, frames in sorted(series.items()):
+        if len(frames) == 1:
+            singles += 1
+            continue
+        first, last, missing = SequenceGaps(frames)
+        if missing:
+            missingList = [f"{x[0]} to {x[1]}" if x[0] != x[1] else str(x[0]) for x in missing]
+            yield f"{label} -> Missing {', '.join(missingList)} of {first}-{last}"
+        else:
+            yield f"{label} -> Complete Sequence from {first}-{last}"
+    if singles or unnumbered:
+        yield f"Skipped {singles} single numbered files and {unnumbered} without a number"
+    if not series:
+        yield f"No numbered files found in {path}"
@@ -3,19 +3,33 @@
 Install poppler -> conda install -c conda-forge poppler.
 """
 
+import contextlib
+import multiprocessing
+import time
+import zlib
 from collections.abc import Generator
-from contextlib import suppress
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
 from pathlib import Path
 
-from PIL import Image, UnidentifiedImageError
+from PIL import Image, PdfParser, UnidentifiedImageError
 from pypdf import PdfWriter
 
-from Src.Utilities.UtilityTools import IMG_EXTS, DeleteFolder, GenerateMessage, GenerateUniqueName
+from Src.Utilities.DirSnapshot import Invalidate, RecordAdd, RecordMove, Snapshot
+from Src.Utilities.Progress import CancelPending, Progress
+from Src.Utilities.UtilityTools import (
+    IMG_EXTS,
+    DeleteFolder,
+    GenerateMessage,
+    GenerateUniqueName,
+    NameIndex,
+)
 
 
 def GetFileExtensions(path: Path) -> set[str]:
-    ext: set[str] = {x.suffix.replace(".", "").lower() for x in path.glob("*.*")}
-    if list(path.glob("*/")):
+    snapshot = Snapshot(path)
+    ext: set[str] = snapshot.Extensions()
+    if snapshot.Dirs:
         ext.add("/")
 
     return ext
@@ -23,71 +37,407 @@ def GetFileExtensions(path: Path) -> set[str]:
 
 def MergePDF(folderPath: Path) -> Generator[str]:
     merger = PdfWriter()
-    for pdf in folderPath.glob("*.pdf"):
+    pdfs = Snapshot(folderPath).Glob("*.pdf")
+    for pdf in pdfs:
         merger.append(pdf)
-    if list(folderPath.glob("*.pdf")):
+    if pdfs:
         merger.write(folderPath.parent / (folderPath.name + ".pdf"))
         merger.close()
+        RecordAdd(folderPath.parent / (folderPath.name + ".pdf"))
         yield folderPath.name + ".pdf Written"
 
 
-def GetPageHeight(imgs: list[Image.Image]) -> int:
-    heights = []
-    for img in imgs:
-        with suppress(ValueError):
-            heights.append(img.size[1])
+def GetPageHeight(heights: list[int]) -> int:
     return int(round(min(max(heights), 2160), 0))
 
 
-def CompileImages(dirPath: Path, quality: float) -> Generator[str]:
-    files: list[Path] = list(dirPath.glob("*.*"))
-    if len(files) > 1:
-        output: list[Image.Image] = []
-        imgs: list[Image.Image] = []
+def FitPage(im: Image.Image, height: int) -> Image.Image:
+    """Scale an image to the page height, capping the width at a 2:1 aspect ratio.
+
+    Parameters
+    ----------
+    im : Image.Image
+        decoded page image
+    height : int
+        target page height
+
+    Returns
+    -------
+    Image.Image
+        resized image
+    """
+    if im.size[1] != height:
+        newWidth: int = round(im.size[0] * (height / im.size[1]))
+        im = im.resize((newWidth, height))
+    if im.size[0] > height * (1800 / 900):
+        newHeight: int = round(im.size[1] * ((height * (1800 / 900)) / im.size[0]))
+        im = im.resize((round(height * (1800 / 900)), newHeight))
+    return im
+
+
+def PageSize(size: tuple[int, int], height: int) -> tuple[int, int]:
+    """Compute the size FitPage would produce without touching any pixels.
+
+    Parameters
+    ----------
+    size : tuple[int, int]
+        source image size
+    height : int
+        target page height
+
+    Returns
+    -------
+    tuple[int, int]
+        final page size
+    """
+    width, imHeight = size
+    if imHeight != height:
+        width, imHeight = round(width * (height / imHeight)), height
+    if width > height * (1800 / 900):
+        imHeight = round(imHeight * ((height * (1800 / 900)) / width))
+        width = round(height * (1800 / 900))
+    return width, imHeight
+
+
+def DecodePage(im: Image.Image, height: int) -> Image.Image:
+    """Decode an image straight to its page size, skipping pixels that would be thrown away.
+
+    JPEGs are DCT scaled by the decoder via draft, other formats are box reduced by the
+    largest integer factor, leaving a single resample for the remaining fraction.
+
+    Parameters
+    ----------
+    im : Image.Image
+        lazily opened page image
+    height : int
+        target page height
+
+    Returns
+    -------
+    Image.Image
+        page sized image
+    """
+    size = PageSize(im.size, height)
+    if size == im.size:
+        return im
+    if im.format == "JPEG":
+        im.draft(im.mode, size)
+    return im.resize(size, reducing_gap=2.0)
+
+
+def EncodePage(im: Image.Image, source: Path | None = None) -> tuple[bytes, dict, str]:
+    """Encode an image as a PDF image stream, following Pillow's PDF writer.
+
+    An unmodified RGB or greyscale JPEG is embedded as its original DCT stream without
+    being decoded or re-encoded.
+
+    Parameters
+    ----------
+    im : Image.Image
+        page image
+    source : Path | None, optional
+        file the image was opened from, if its pixels have not been changed
+
+    Returns
+    -------
+    tuple[bytes, dict, str]
+        encoded stream, image dictionary entries and procset name
+    """
+    passthrough = source is not None and im.format == "JPEG" and im.mode in {"L", "RGB"}
+    if im.mode == "1":
+        im = im.convert("L")
+    elif im.mode == "PA":
+        im = im.convert("RGBA")
+    elif im.mode not in {"L", "LA", "P", "RGB", "RGBA", "CMYK"}:
+        im = im.convert("RGB")
+
+    op = BytesIO()
+    imageDict: dict = {"BitsPerComponent": 8}
+    procset = "ImageB" if im.mode in {"L", "LA"} else "ImageC"
+    if im.mode == "P":
+        palette = im.getpalette() or []
+        imageDict["ColorSpace"] = [
+            PdfParser.PdfName("Indexed"),
+            PdfParser.PdfName("DeviceRGB"),
+            len(palette) // 3 - 1,
+            PdfParser.PdfBinary(bytes(palette)),
+        ]
+        imageDict["Filter"] = PdfParser.PdfName("FlateDecode")
+        op.write(zlib.compress(im.tobytes()))
+        procset = "ImageI"
+    elif im.mode in {"LA", "RGBA"}:
+        del imageDict["BitsPerComponent"]
+        imageDict["Filter"] = PdfParser.PdfName("JPXDecode")
+        imageDict["SMaskInData"] = 1
+        im.save(op, "JPEG2000")
+    else:
+        imageDict["ColorSpace"] = PdfParser.PdfName(
+            {"L": "DeviceGray", "RGB": "DeviceRGB", "CMYK": "DeviceCMYK"}[im.mode],
+        )
+        if im.mode == "CMYK":
+            imageDict["Decode"] = [1, 0, 1, 0, 1, 0, 1, 0]
+        imageDict["Filter"] = PdfParser.PdfName("DCTDecode")
+        if passthrough and source:
+            op.write(source.read_bytes())
+        else:
+            im.save(op, "JPEG")
+    return op.getvalue(), imageDict, procset
+
+
+def StartPDF(pdfPath: Path) -> PdfParser.PdfParser:
+    """Open a new PDF for pages to be streamed into.
+
+    Parameters
+    ----------
+    pdfPath : Path
+        output file
+
+    Returns
+    -------
+    PdfParser.PdfParser
+        writer, pass to WritePage then FinishPDF
+    """
+    pdf = PdfParser.PdfParser(filename=str(pdfPath), mode="w+b")
+    pdf.info["Title"] = pdfPath.stem
+    pdf.info["CreationDate"] = pdf.info["ModDate"] = time.gmtime()
+    pdf.start_writing()
+    pdf.write_header()
+    pdf.pages_ref = pdf.next_object_id(0)
+    return pdf
+
 
+def WritePage(
+    pdf: PdfParser.PdfParser,
+    stream: bytes,
+    imageDict: dict,
+    procset: str,
+    size: tuple[int, int],
+) -> None:
+    """Write a single image page straight to the output file.
+
+    Parameters
+    ----------
+    pdf : PdfParser.PdfParser
+        writer from StartPDF
+    stream : bytes
+        encoded image stream
+    imageDict : dict
+        image dictionary entries for the stream
+    procset : str
+        procset name for the image type
+    size : tuple[int, int]
+        image size in pixels, one pixel per point
+    """
+    width, height = size
+    imageRef = pdf.write_obj(
+        None,
+        stream=stream,
+        Type=PdfParser.PdfName("XObject"),
+        Subtype=PdfParser.PdfName("Image"),
+        Width=width,
+        Height=height,
+        **imageDict,
+    )
+    contentsRef = pdf.write_obj(
+        None,
+        stream=b"q %f 0 0 %f 0 0 cm /image Do Q\n" % (float(width), float(height)),
+    )
+    pageRef = pdf.next_object_id(0)
+    pdf.write_page(
+        pageRef,
+        Resources=PdfParser.PdfDict(
+            ProcSet=[PdfParser.PdfName("PDF"), PdfParser.PdfName(procset)],
+            XObject=PdfParser.PdfDict(image=imageRef),
+        ),
+        MediaBox=[0, 0, float(width), float(height)],
+        Contents=contentsRef,
+    )
+    pdf.pages.append(pageRef)
+
+
+def FinishPDF(pdf: PdfParser.PdfParser) -> None:
+    """Write the page tree, catalog and trailer then close the file.
+
+    Parameters
+    ----------
+    pdf : PdfParser.PdfParser
+        writer from StartPDF
+    """
+    pdf.write_obj(
+        pdf.pages_ref,
+        Type=PdfParser.PdfName("Pages"),
+        Count=len(pdf.pages),
+        Kids=pdf.pages,
+    )
+    rootRef = pdf.write_obj(None, Type=PdfParser.PdfName("Catalog"), Pages=pdf.pages_ref)
+    pdf.write_xref_and_trailer(rootRef)
+    pdf.close()
+
+
+def CompileImages(dirPath: Path, quality: float) -> Generator[str | Progress]:
+    """Compile a folder of images into a PDF next to it.
+
+    Only image headers are read up front, pages are then decoded, resized and appended to
+    the PDF one at a time so memory stays flat regardless of the page count. Below 100%
+    quality pages are decoded at reduced resolution, JPEGs already at page size are copied
+    in as is.
+
+    Parameters
+    ----------
+    dirPath : Path
+        folder of images
+    quality : float
+        percentage of the page height to render at
+
+    Yields
+    ------
+    Generator[str | Progress]
+        progress per page, then a status string
+    """
+    files: list[Path] = Snapshot(dirPath).Glob("*.*")
+    if len(files) > 1:
+        heights: list[int] = []
         try:
-            imgs: list[Image.Image] = [Image.open(file).copy() for file in files]
+            for file in files:
+                with Image.open(file) as im:
+                    heights.append(im.size[1])
         except UnidentifiedImageError as e:
             yield f"Unable to compile {dirPath} -> {e} {type(e)}"
+            return
 
-        if imgs:
-            height = round((GetPageHeight(imgs=imgs) * quality) / 100)
-            for im in imgs:
-                newWidth: int = im.size[0]
-                if im.size[1] != height:
-                    newWidth: int = round(im.size[0] * (height / im.size[1]))
-                    im = im.resize((newWidth, height))
-                if im.size[0] > height * (1800 / 900):
-                    newHeight: int = round(im.size[1] * ((height * (1800 / 900)) / im.size[0]))
-                    im = im.resize((round(height * (1800 / 900)), newHeight))
-                output.append(im)
-
-        if output:
-            pdfPath = GenerateUniqueName(dirPath.parent / (dirPath.stem + ".pdf"))
-            output[0].save(pdfPath, "PDF", save_all=True, append_images=output[1:])
-            yield f"{pdfPath.name} - {len(output)} pages"
+        height = round((GetPageHeight(heights) * quality) / 100)
+        pdfPath = GenerateUniqueName(
+            dirPath.parent / (dirPath.stem + ".pdf"),
+            NameIndex(dirPath.parent),
+        )
+        pdf = StartPDF(pdfPath)
+        complete = False
+        failure = ""
+        try:
+            for done, file in enumerate(files, start=1):
+                with Image.open(file) as im:
+                    page = DecodePage(im, height) if quality < 100 else FitPage(im, height)
+                    WritePage(pdf, *EncodePage(page, file if page is im else None), page.size)
+                yield Progress(done, len(files), Item=file.name)
+            complete = True
+        except Exception as e:
+            failure = f"Unable to compile {dirPath} -> {e} {type(e)}"
+        finally:
+            try:
+                FinishPDF(pdf)
+            finally:
+                if complete:
+                    RecordAdd(pdfPath)
+                else:
+                    # Failed or cancelled, a PDF missing pages is not worth keeping
+                    pdfPath.unlink(missing_ok=True)
+        yield failure or f"{pdfPath.name} - {len(files)} pages"
 
     elif len(files) == 1:
         file = files[0]
         file.rename(dirPath.parent / f"{dirPath.name}{file.suffix}")
+        RecordMove(file, dirPath.parent / f"{dirPath.name}{file.suffix}")
         DeleteFolder(dirPath)
         yield f"{file.stem} simplified"
     else:
         yield f"Error with {dirPath}"
 
 
-def CompileFolders(p: Path, quality: float) -> Generator[str]:
-    for dirPath in [x for x in p.glob("*/") if x.stem[0] != "_"]:
-        exts = GetFileExtensions(dirPath)
-        if "/" in exts:
-            yield from GenerateMessage(f"ERROR -> subfolder found in {dirPath}")
-        elif exts == {"pdf"}:
-            yield from MergePDF(dirPath)
-        elif all(x in IMG_EXTS for x in exts):
-            yield from CompileImages(dirPath, quality)
-        else:
-            yield from GenerateMessage(
-                "Incompatible files found "
-                f"({','.join([x for x in exts if x not in IMG_EXTS])})"
-                f" -> {dirPath.stem}",
-            )
+def CompileFolder(dirPath: Path, quality: float) -> Generator[str | Progress]:
+    """Compile one folder, merging pdfs or compiling images depending on what it holds.
+
+    Parameters
+    ----------
+    dirPath : Path
+        folder to compile
+    quality : float
+        percentage of the page height to render at
+
+    Yields
+    ------
+    Generator[str | Progress]
+        status strings, with page progress when compiling images
+    """
+    exts = GetFileExtensions(dirPath)
+    if "/" in exts:
+        yield from GenerateMessage(f"ERROR -> subfolder found in {dirPath}")
+    elif exts == {"pdf"}:
+        yield from MergePDF(dirPath)
+    elif all(x in IMG_EXTS for x in exts):
+        yield from CompileImages(dirPath, quality)
+    else:
+        yield from GenerateMessage(
+            "Incompatible files found "
+            f"({','.join([x for x in exts if x not in IMG_EXTS])})"
+            f" -> {dirPath.stem}",
+        )
+
+
+def CompileFolderMessages(dirPath: Path, quality: float) -> list[str]:
+    """Compile a folder in a worker process, collecting its status strings.
+
+    Parameters
+    ----------
+    dirPath : Path
+        folder to compile
+    quality : float
+        percentage of the page height to render at
+
+    Returns
+    -------
+    list[str]
+        status strings, progress is dropped as it cannot be shown from another process
+    """
+    return [x for x in CompileFolder(dirPath, quality) if isinstance(x, str)]
+
+
+def CompileFolders(p: Path, quality: float, workers: int = 1) -> Generator[str | Progress]:
+    """Compile every subfolder of a folder into a PDF.
+
+    Parameters
+    ----------
+    p : Path
+        master folder
+    quality : float
+        percentage of the page height to render at
+    workers : int, optional
+        number of folders compiled at once in separate processes, by default 1
+
+    Yields
+    ------
+    Generator[str | Progress]
+        status strings, in completion order when running in parallel, and progress per folder
+    """
+    folders = [x for x in Snapshot(p).Folders() if x.stem[0] != "_"]
+    if workers <= 1:
+        for done, dirPath in enumerate(folders):
+            with contextlib.closing(CompileFolder(dirPath, quality)) as messages:
+                for message in messages:
+                    if isinstance(message, str):
+                        yield message
+                    else:
+                        # Page progress keeps the folder count, it only names the page
+                        item = f"{dirPath.name} {message.Done}/{message.Total}"
+                        yield Progress(done, len(folders), Item=item)
+            yield Progress(done + 1, len(folders), Item=dirPath.name)
+        return
+
+    # A forked child would inherit any lock another thread holds at that moment, the
+    # snapshot lock included, and hang on it for good
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        futures = {pool.submit(CompileFolderMessages, x, quality): x for x in folders}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    yield from future.result()
+                except Exception as e:
+                    yield f"ERROR -> {futures[future].name}: {e}"
+                # The child recorded its changes in its own snapshots, not ours
+                Invalidate(p)
+                Invalidate(futures[future])
+                yield Progress(done, len(folders), Item=futures[future].name)
+        finally:
+            CancelPending(pool)
@@ -1,11 +1,16 @@
 """Doc to trim borders from images."""
 
+import multiprocessing
 import sys
 from collections.abc import Generator
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any
 
-from PIL import Image, UnidentifiedImageError
+import numpy as np
+from PIL import Image
+
+from Src.Utilities.DirSnapshot import Snapshot
+from Src.Utilities.Progress import CancelPending, Progress
 
 CONFIG = {
     "BORDER_COLOR": [255, 255, 255],
@@ -15,105 +20,233 @@ CONFIG = {
 }
 
 
-def IsBorder(pixel: tuple) -> bool:
-    return all(abs(pixel[i] - CONFIG["BORDER_COLOR"][i]) <= CONFIG["TOLERANCE"] for i in range(3))
+NATIVE_MODES: set[str] = {"RGB", "RGBA", "L", "P"}
+
+
+def PaletteArray(img: Image.Image) -> np.ndarray:
+    """Resolve every palette index of a P mode image to its RGB value.
+
+    Parameters
+    ----------
+    img : Image.Image
+        palette image
+
+    Returns
+    -------
+    np.ndarray
+        256x3 lookup table, matching the colours produced by ``convert("RGB")``
+    """
+    ramp = Image.frombytes("P", (256, 1), bytes(range(256)))
+    ramp.putpalette(img.getpalette() or [])
+    return np.asarray(ramp.convert("RGB"))[0]
+
+
+def WithinTolerance(channels: np.ndarray, borderColor: list[int], tolerance: int) -> np.ndarray:
+    """Flag values within tolerance of the border color on every RGB channel.
+
+    Parameters
+    ----------
+    channels : np.ndarray
+        array of shape (..., 3) for colour data, or (..., 1) for greyscale data
+    borderColor : list[int]
+        RGB border color
+    tolerance : int
+        allowed deviation per channel
+
+    Returns
+    -------
+    np.ndarray
+        boolean array of shape channels.shape[:-1]
+    """
+    mask = np.ones(channels.shape[:-1], dtype=bool)
+    for idx, color in enumerate(borderColor[:3]):
+        channel = channels[..., min(idx, channels.shape[-1] - 1)]
+        mask &= channel >= max(color - tolerance, 0)
+        mask &= channel <= min(color + tolerance, 255)
+    return mask
+
+
+def BorderMask(img: Image.Image, borderColor: list[int] | None, tolerance: int) -> np.ndarray:
+    """Build a per-pixel mask of border colored pixels.
+
+    RGB, RGBA, L and P images are read straight from their own buffer, other modes go
+    through an RGB conversion first.
+
+    Parameters
+    ----------
+    img : Image.Image
+        source image
+    borderColor : list[int] | None
+        RGB border color, None to use the top left pixel
+    tolerance : int
+        allowed deviation per channel
 
+    Returns
+    -------
+    np.ndarray
+        boolean (height, width) array, true where the pixel matches the border
+    """
+    if img.mode not in NATIVE_MODES:
+        img = img.convert("RGB")
+    pixels = np.asarray(img)
 
-def DetermineBoundary(
-    pixels: Any,
-    width: int,
-    height: int,
-) -> tuple[int, int, int, int]:
-    top = 0
-    for y in range(height):
-        if any(not IsBorder(pixels[x, y]) for x in range(width)):
-            break
-        top += 1
+    if img.mode == "P":
+        palette = PaletteArray(img)
+        if borderColor is None:
+            borderColor = palette[pixels[0, 0]].tolist()
+        return WithinTolerance(palette, borderColor, tolerance)[pixels]
 
-    bottom = height - 1
-    for y in range(height - 1, -1, -1):
-        if any(not IsBorder(pixels[x, y]) for x in range(width)):
-            break
-        bottom -= 1
+    if img.mode == "L":
+        pixels = pixels[..., np.newaxis]
+    if borderColor is None:
+        borderColor = np.resize(pixels[0, 0, :3], 3).tolist()
+    return WithinTolerance(pixels[..., :3], borderColor, tolerance)
 
-    left = 0
-    for x in range(width):
-        if any(not IsBorder(pixels[x, y]) for y in range(height)):
-            break
-        left += 1
 
-    right = width - 1
-    for x in range(width - 1, -1, -1):
-        if any(not IsBorder(pixels[x, y]) for y in range(height)):
-            break
-        right -= 1
-    return top, bottom, left, right
+def DetermineBoundary(mask: np.ndarray) -> tuple[int, int, int, int]:
+    """Find the outermost rows and columns containing a non border pixel.
+
+    Parameters
+    ----------
+    mask : np.ndarray
+        boolean border mask from BorderMask
+
+    Returns
+    -------
+    tuple[int, int, int, int]
+        top, bottom, left, right (inclusive)
+    """
+    height, width = mask.shape
+    rows = np.flatnonzero(~mask.all(axis=1))
+    cols = np.flatnonzero(~mask.all(axis=0))
+    if rows.size == 0:
+        return height, -1, width, -1
+    return int(rows[0]), int(rows[-1]), int(cols[0]), int(cols[-1])
 
 
 def StripBorders(
     image_path: Path,
     border_color: None | str = None,
     save_path: Path | None = None,
+    tolerance: int = CONFIG["TOLERANCE"],
+    padding: int = CONFIG["PADDING"],
+    auto: bool = CONFIG["AUTO"],
 ) -> bool:
     """Strip uneven borders from an image based on a given border color, with optional tolerance.
 
+    All settings are passed per call so files can be trimmed in parallel processes.
+
     Args:
         image_path (str): Path to the input image.
-        border_color (tuple): RGB tuple of the border to remove (e.g (255, 255, 255) for white)
+        border_color (str, optional): RGB string of the border to remove (e.g "255,255,255")
         save_path (str, optional): Path to save the processed image. If None, does not save.
+        tolerance (int, optional): Allowed deviation per channel.
+        padding (int, optional): Pixels of border to keep around the content.
+        auto (bool, optional): Use the top left pixel as border color when none is given.
 
     Returns
     -------
-        Image: Pillow Image object without the border.
+        bool: True if a cropped image was saved.
     """
-    img = Image.open(image_path).convert("RGB")
-    pixels = img.load()
-    if pixels is None:
-        raise UnidentifiedImageError(image_path)
-
+    borderColor: list[int] | None = None
     if isinstance(border_color, str):
-        CONFIG["BORDER_COLOR"] = [int(x) for x in border_color.split(",")]
-        CONFIG["AUTO"] = False
-    if CONFIG["AUTO"]:
-        CONFIG["BORDER_COLOR"] = pixels[0, 0]
-
-    width, height = img.size
-
-    # Determine crop boundaries
-    top, bottom, left, right = DetermineBoundary(pixels, width, height)
-    # Crop the image
-    cropped = img.crop(
-        (
-            max(0, left - CONFIG["PADDING"]),
-            max(0, top - CONFIG["PADDING"]),
-            min(right + 1 + CONFIG["PADDING"], width),
-            min(bottom + 1 + CONFIG["PADDING"], height),
-        ),
-    )
-    if save_path and cropped.size != img.size:
+        borderColor = [int(x) for x in border_color.split(",")]
+    elif not auto:
+        borderColor = CONFIG["BORDER_COLOR"]
+
+    with Image.open(image_path) as img:
+        width, height = img.size
+
+        # Determine crop boundaries
+        top, bottom, left, right = DetermineBoundary(BorderMask(img, borderColor, tolerance))
+        if top > bottom:
+            # Nothing but border, leave the image alone
+            return False
+        # Crop the image
+        cropped = img.crop(
+            (
+                max(0, left - padding),
+                max(0, top - padding),
+                min(right + 1 + padding, width),
+                min(bottom + 1 + padding, height),
+            ),
+        )
+    if save_path and cropped.size != (width, height):
         print(f"Saved to {save_path.stem}")
         cropped.save(save_path)
         return True
     return False
 
 
-def TrimAllEdges(path: Path, color: str | None = None) -> Generator[str]:
-    files = list(path.glob("*.*"))
+def TrimAllEdges(
+    path: Path,
+    color: str | None = None,
+    workers: int = 1,
+    tolerance: int = CONFIG["TOLERANCE"],
+    padding: int = CONFIG["PADDING"],
+    auto: bool = CONFIG["AUTO"],
+) -> Generator[str | Progress]:
+    """Trim the borders of every image in a folder.
+
+    Parameters
+    ----------
+    path : Path
+        folder of images
+    color : str | None, optional
+        RGB string of the border color, by default None
+    workers : int, optional
+        number of processes to trim with, by default 1 (in process)
+    tolerance : int, optional
+        allowed deviation per channel
+    padding : int, optional
+        pixels of border to keep around the content
+    auto : bool, optional
+        use the top left pixel as border color when no color is given
+
+    Yields
+    ------
+    Generator[str | Progress]
+        one status string per failed file and progress per file as it finishes, then a summary
+    """
+    files = Snapshot(path).Glob("*.*")
+    settings = {"border_color": color, "tolerance": tolerance, "padding": padding, "auto": auto}
+    trimmed = 0
     failed = 0
-    for file in files:
-        try:
-            if not StripBorders(
-                image_path=file,
-                border_color=color,
-                save_path=file,
-            ):
+    if workers <= 1:
+        for done, file in enumerate(files, start=1):
+            try:
+                if StripBorders(image_path=file, save_path=file, **settings):
+                    trimmed += 1
+            except (OSError, ValueError) as e:
                 failed += 1
-        except UnidentifiedImageError as e:
-            failed + 1  # pyright: ignore[reportUnusedExpression]
-            yield f"Error {e} -> {file}"
-    yield f"{len(files) - failed}/{len(files)} trimmed"
+                yield f"Error {e} -> {file}"
+            yield Progress(done, len(files), Item=file.name)
+    else:
+        # Spawned rather than forked, see CompileFolders
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = {
+                pool.submit(StripBorders, image_path=file, save_path=file, **settings): file
+                for file in files
+            }
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    try:
+                        if future.result():
+                            trimmed += 1
+                    except (OSError, ValueError) as e:
+                        failed += 1
+                        yield f"Error {e} -> {futures[future]}"
+                    yield Progress(done, len(files), Item=futures[future].name)
+            finally:
+                CancelPending(pool)
+    yield f"{trimmed}/{len(files)} trimmed" + (f", {failed} failed" if failed else "")
 
 
 if __name__ == "__main__":
     p = Path(sys.argv[1])
-    print(TrimAllEdges(p, None))
+    for message in TrimAllEdges(p, None):
+        if isinstance(message, str):
+            print(message)
@@ -0,0 +1,338 @@
+"""In-memory snapshots of folder listings shared by every folder operation.
+
+A folder is read with a single scandir and its entries kept with their lazily cached stat
+results, so repeated glob, extension and subfolder queries never go back to the disk.
+Cached snapshots are revalidated against the folder mtime, one stat per lookup, and
+operations record the entries they create, move or remove so the snapshots they hold stay
+current. A recorded change leaves the folder to be rescanned on its next lookup, since its
+new mtime cannot tell our change apart from someone else's made at the same time.
+
+Only folder listings are cached with any authority. File sizes and times can change without
+touching the folder mtime, so decisions that depend on them stat the file again.
+"""
+
+import os
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Generator
+from fnmatch import filter as fnFilter
+from pathlib import Path
+
+
+class DirSnapshot:
+    """Entries of one folder, read once with scandir.
+
+    Stat results are the ones scandir provides, taken without following symlinks, so
+    symlinked folders are listed as entries but never walked.
+    """
+
+    def __init__(self, folder: Path) -> None:
+        self.Folder = folder
+        self.MTime: int = folder.stat().st_mtime_ns
+        with os.scandir(folder) as entries:
+            self.Entries: dict[str, os.DirEntry | None] = {x.name: x for x in entries}
+        self.Dirs: set[str] = {
+            name for name, x in self.Entries.items() if x and x.is_dir(follow_symlinks=False)
+        }
+        self.Stats: dict[str, os.stat_result] = {}
+
+    def __contains__(self, name: str) -> bool:
+        """Check if the folder has an entry with this name."""
+        return name in self.Entries
+
+    def Stat(self, name: str) -> os.stat_result:
+        """Get the stat result of an entry, from scandir where it is already known.
+
+        Parameters
+        ----------
+        name : str
+            entry name
+
+        Returns
+        -------
+        os.stat_result
+            stat of the entry, not following symlinks
+        """
+        if name not in self.Stats:
+            entry = self.Entries[name]
+            self.Stats[name] = (
+                entry.stat(follow_symlinks=False) if entry else (self.Folder / name).lstat()
+            )
+        return self.Stats[name]
+
+    def Glob(self, pattern: str = "*") -> list[Path]:
+        """Match entry names like Path.glob with a single component pattern.
+
+        Parameters
+        ----------
+        pattern : str, optional
+            glob pattern, by default "*"
+
+        Returns
+        -------
+        list[Path]
+            matching files and folders, sorted by name
+        """
+        return [self.Folder / x for x in sorted(fnFilter(list(self.Entries), pattern))]
+
+    def Files(self, pattern: str = "*") -> list[Path]:
+        """Match entries like Glob, leaving out folders.
+
+        Parameters
+        ----------
+        pattern : str, optional
+            glob pattern, by default "*"
+
+        Returns
+        -------
+        list[Path]
+            matching files and symlinks, sorted by name
+        """
+        return [x for x in self.Glob(pattern) if x.name not in self.Dirs]
+
+    def Folders(self) -> list[Path]:
+        """List the subfolders, not including symlinks to folders.
+
+        Returns
+        -------
+        list[Path]
+            subfolders sorted by name
+        """
+        return [self.Folder / x for x in sorted(self.Dirs)]
+
+    def Extensions(self) -> set[str]:
+        """Collect the lowercase extensions of the files in the folder, without dots.
+
+        Returns
+        -------
+        set[str]
+            file extensions
+        """
+        return {Path(x).suffix[1:].lower() for x in list(self.Entries) if "." in x} - {""}
+
+    def Add(self, name: str, isDir: bool = False) -> None:
+        """Record an entry created in the folder, stat deferred until asked for.
+
+        Parameters
+        ----------
+        name : str
+            entry name
+        isDir : bool, optional
+            true if the entry is a folder, by default False
+        """
+        self.Entries[name] = None
+        self.Stats.pop(name, None)
+        if isDir:
+            self.Dirs.add(name)
+        self.Expire()
+
+    def Remove(self, name: str) -> None:
+        """Record an entry deleted or moved out of the folder.
+
+        Parameters
+        ----------
+        name : str
+            entry name
+        """
+        self.Entries.pop(name, None)
+        self.Stats.pop(name, None)
+        self.Dirs.discard(name)
+        self.Expire()
+
+    def Expire(self) -> None:
+        """Fail the next mtime check, so the next lookup rescans the folder."""
+        self.MTime = -1
+
+
+MAX_SNAPSHOTS = 4096
+
+_SNAPSHOTS: OrderedDict[Path, DirSnapshot] = OrderedDict()
+_TRUSTED: Counter[Path] = Counter()
+_LOCK = threading.Lock()
+# Bumped by every recorded change, a scan that overlapped one is not cached
+_GENERATION = 0
+
+
+def Snapshot(folder: Path) -> DirSnapshot:
+    """Get the snapshot of a folder, rescanning only if something else changed it.
+
+    Folders kept current by a watcher are trusted and skip the mtime check entirely. The
+    least recently used snapshots are dropped past MAX_SNAPSHOTS. The folder is read
+    outside the lock, which is only held to look up and publish snapshots, so one slow
+    folder never holds up lookups of the others.
+
+    Parameters
+    ----------
+    folder : Path
+        folder to list
+
+    Returns
+    -------
+    DirSnapshot
+        cached or fresh snapshot
+    """
+    with _LOCK:
+        snapshot = _SNAPSHOTS.get(folder)
+        trusted = folder in _TRUSTED
+        generation = _GENERATION
+    if snapshot is not None and (trusted or folder.stat().st_mtime_ns == snapshot.MTime):
+        with _LOCK:
+            if folder in _SNAPSHOTS:
+                _SNAPSHOTS.move_to_end(folder)
+        return snapshot
+
+    snapshot = DirSnapshot(folder)
+    with _LOCK:
+        # A change recorded mid scan may be missing from it, leave the next lookup to rescan
+        if generation == _GENERATION:
+            _SNAPSHOTS[folder] = snapshot
+            _SNAPSHOTS.move_to_end(folder)
+            while len(_SNAPSHOTS) > MAX_SNAPSHOTS:
+                _SNAPSHOTS.popitem(last=False)
+    return snapshot
+
+
+def Walk(root: Path) -> Generator[DirSnapshot]:
+    """Snapshot a folder and every folder below it, without following symlinks.
+
+    Parameters
+    ----------
+    root : Path
+        top folder
+
+    Yields
+    ------
+    Generator[DirSnapshot]
+        snapshot of each folder, parents before children
+    """
+    pending: list[Path] = [root]
+    while pending:
+        snapshot = Snapshot(pending.pop())
+        yield snapshot
+        pending += reversed(snapshot.Folders())
+
+
+def Glob(root: Path, pattern: str) -> list[Path]:
+    """Match a glob pattern from snapshots, recursing only when the pattern needs it.
+
+    Parameters
+    ----------
+    root : Path
+        folder the pattern is relative to
+    pattern : str
+        glob pattern, "**" and the platform's separators are supported
+
+    Returns
+    -------
+    list[Path]
+        matching files and folders
+    """
+    if os.sep not in pattern and (os.altsep is None or os.altsep not in pattern):
+        return Snapshot(root).Glob(pattern)
+    return [
+        x
+        for snapshot in Walk(root)
+        for x in snapshot.Glob()
+        if x.relative_to(root).full_match(pattern)
+    ]
+
+
+def RecordAdd(path: Path, isDir: bool = False) -> None:
+    """Record a new file or folder in its parent's snapshot, if the parent is cached.
+
+    Parameters
+    ----------
+    path : Path
+        created entry
+    isDir : bool, optional
+        true if the entry is a folder, by default False
+    """
+    global _GENERATION
+    with _LOCK:
+        _GENERATION += 1
+        if snapshot := _SNAPSHOTS.get(path.parent):
+            snapshot.Add(path.name, isDir)
+
+
+def RecordRemove(path: Path) -> None:
+    """Drop a deleted entry from its parent's snapshot, and its own if it was a folder.
+
+    Snapshots of folders further down are left to fail their stat when next used.
+
+    Parameters
+    ----------
+    path : Path
+        deleted file or folder
+    """
+    global _GENERATION
+    with _LOCK:
+        _GENERATION += 1
+        if snapshot := _SNAPSHOTS.get(path.parent):
+            snapshot.Remove(path.name)
+        _SNAPSHOTS.pop(path, None)
+
+
+def RecordMove(src: Path, dst: Path) -> None:
+    """Record a rename or move in the snapshots of both parents.
+
+    Parameters
+    ----------
+    src : Path
+        old path
+    dst : Path
+        new path
+    """
+    global _GENERATION
+    with _LOCK:
+        _GENERATION += 1
+        isDir = False
+        if snapshot := _SNAPSHOTS.get(src.parent):
+            isDir = src.name in snapshot.Dirs
+            snapshot.Remove(src.name)
+        if snapshot := _SNAPSHOTS.get(dst.parent):
+            snapshot.Add(dst.name, isDir)
+        _SNAPSHOTS.pop(src, None)
+
+
+def Trust(folders: list[Path]) -> None:
+    """Serve folders from their snapshots without revalidating, while a watcher covers them.
+
+    Trust is counted per watcher, so a folder stays trusted until every watcher that
+    trusted it has let go.
+
+    Parameters
+    ----------
+    folders : list[Path]
+        watched folders
+    """
+    with _LOCK:
+        _TRUSTED.update(folders)
+
+
+def Distrust(folders: list[Path]) -> None:
+    """Release a watcher's trust, going back to mtime checks once no watcher is left.
+
+    Parameters
+    ----------
+    folders : list[Path]
+        folders leaving the watch
+    """
+    with _LOCK:
+        _TRUSTED.subtract(folders)
+        for folder in folders:
+            if _TRUSTED[folder] <= 0:
+                del _TRUSTED[folder]
+
+
+def Invalidate(folder: Path) -> None:
+    """Drop a cached snapshot so the next lookup rescans the folder.
+
+    Parameters
+    ----------
+    folder : Path
+        changed folder
+    """
+    global _GENERATION
+    with _LOCK:
+        _GENERATION += 1
+        _SNAPSHOTS.pop(folder, None)
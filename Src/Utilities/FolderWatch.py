@@ -0,0 +1,430 @@
+"""Live index of a watched folder tree, kept current while the gui is open.
+
+On Linux the tree is watched through inotify, loaded from libc so nothing extra needs to be
+installed. Other platforms, a failed watch or a kernel queue overflow fall back to periodic
+rescans, which only cost a stat per folder thanks to the snapshot layer.
+
+While inotify covers a folder its snapshot is trusted, so every operation reading it skips
+even the mtime check, and sequence checks are answered straight from the index. Operations
+that write through another process or library drop the snapshots of the folders they wrote
+to, rather than wait for the events to arrive.
+"""
+
+import contextlib
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from stat import S_ISREG
+
+from Src.Utilities.DirSnapshot import Distrust, Invalidate, Trust, Walk
+from Src.Utilities.UtilityTools import SplitFrameName
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+EVENT = struct.Struct("iIII")
+
+
+def LoadInotify() -> ctypes.CDLL | None:
+    """Load the inotify calls from libc.
+
+    Returns
+    -------
+    ctypes.CDLL | None
+        libc, None where inotify is unavailable
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+class FolderIndex:
+    """Files, sizes and numbered series of a folder tree, updated from filesystem events."""
+
+    def __init__(self, root: Path, interval: float = 10.0) -> None:
+        self.Root = root
+        self.Interval = interval
+        self.Mode = "polling"
+        self.Files: dict[Path, int] = {}
+        self.Frames: dict[tuple[Path, str], Counter[int]] = {}
+        self.Unnumbered: Counter[Path] = Counter()
+        self.Watches: dict[int, Path] = {}
+        self.Trusted: set[Path] = set()
+        self.Lock = threading.Lock()
+        self.Ready = threading.Event()
+        self.Stopped = threading.Event()
+        self.Libc = LoadInotify()
+        self.Fd = -1
+        self.Thread = threading.Thread(target=self.Run, name=f"Watch {root.name}", daemon=True)
+
+    # region Index
+    @staticmethod
+    def CountFile(
+        frames: dict[tuple[Path, str], Counter[int]],
+        unnumbered: Counter[Path],
+        path: Path,
+    ) -> None:
+        """Count a file not yet indexed in its series, or as unnumbered.
+
+        Parameters
+        ----------
+        frames : dict[tuple[Path, str], Counter[int]]
+            (folder, series label) -> frame number counts
+        unnumbered : Counter[Path]
+            folder -> files without any digits
+        path : Path
+            file to count
+        """
+        if frame := SplitFrameName(path.name):
+            frames.setdefault((path.parent, frame[0]), Counter())[frame[1]] += 1
+        else:
+            unnumbered[path.parent] += 1
+
+    def AddFile(self, path: Path, size: int | None = None) -> None:
+        """Index a created or changed file.
+
+        Parameters
+        ----------
+        path : Path
+            file inside the tree
+        size : int | None, optional
+            size if already known, by default None to stat the file
+        """
+        if size is None:
+            try:
+                stat = path.lstat()
+            except OSError:
+                self.RemoveFile(path)
+                return
+            if not S_ISREG(stat.st_mode):
+                return
+            size = stat.st_size
+        with self.Lock:
+            if path not in self.Files:
+                self.CountFile(self.Frames, self.Unnumbered, path)
+            self.Files[path] = size
+
+    def RemoveFile(self, path: Path) -> None:
+        """Drop a deleted or moved file from the index.
+
+        Parameters
+        ----------
+        path : Path
+            file inside the tree
+        """
+        with self.Lock:
+            if self.Files.pop(path, None) is None:
+                return
+            if frame := SplitFrameName(path.name):
+                frames = self.Frames[path.parent, frame[0]]
+                frames[frame[1]] -= 1
+                if frames[frame[1]] <= 0:
+                    del frames[frame[1]]
+                if not frames:
+                    del self.Frames[path.parent, frame[0]]
+            else:
+                self.Unnumbered[path.parent] -= 1
+
+    def ScanTree(self, folder: Path) -> dict[Path, int]:
+        """Walk a folder tree, watching every folder in it and trusting them while watched.
+
+        Parameters
+        ----------
+        folder : Path
+            top folder
+
+        Returns
+        -------
+        dict[Path, int]
+            regular file -> size
+        """
+        files: dict[Path, int] = {}
+        folders: list[Path] = []
+        for snapshot in Walk(folder):
+            folders.append(snapshot.Folder)
+            self.AddWatch(snapshot.Folder)
+            for file in snapshot.Files():
+                stat = snapshot.Stat(file.name)
+                if S_ISREG(stat.st_mode):
+                    files[file] = stat.st_size
+        if self.Fd >= 0:
+            self.Trust(folders)
+        return files
+
+    def AddTree(self, folder: Path) -> None:
+        """Index a folder created or moved into the tree.
+
+        Parameters
+        ----------
+        folder : Path
+            new folder
+        """
+        for file, size in self.ScanTree(folder).items():
+            self.AddFile(file, size)
+
+    def RemoveTree(self, folder: Path) -> None:
+        """Drop a deleted or moved folder, and everything below it, from the index.
+
+        Parameters
+        ----------
+        folder : Path
+            removed folder
+        """
+        with self.Lock:
+            files = [x for x in self.Files if x.is_relative_to(folder)]
+        for file in files:
+            self.RemoveFile(file)
+        stale = {wd: x for wd, x in self.Watches.items() if x.is_relative_to(folder)}
+        for wd in stale:
+            if self.Libc is not None and self.Fd >= 0:
+                self.Libc.inotify_rm_watch(self.Fd, wd)
+            del self.Watches[wd]
+        self.Distrust(list(stale.values()))
+
+    def Rescan(self) -> None:
+        """Rebuild the index from a fresh walk of the tree.
+
+        The new index is built to the side and swapped in whole, so readers see either the
+        old or the new one and never a partial walk.
+        """
+        self.Distrust(list(self.Trusted))
+        files = self.ScanTree(self.Root)
+        frames: dict[tuple[Path, str], Counter[int]] = {}
+        unnumbered: Counter[Path] = Counter()
+        for file in files:
+            self.CountFile(frames, unnumbered, file)
+        with self.Lock:
+            self.Files = files
+            self.Frames = frames
+            self.Unnumbered = unnumbered
+        self.Ready.set()
+
+    def Trust(self, folders: list[Path]) -> None:
+        """Trust the snapshots of watched folders, once per index.
+
+        Parameters
+        ----------
+        folders : list[Path]
+            folders now covered by a watch
+        """
+        new = set(folders) - self.Trusted
+        self.Trusted |= new
+        Trust(list(new))
+
+    def Distrust(self, folders: list[Path]) -> None:
+        """Release this index's trust in folders, leaving any other index's in place.
+
+        Parameters
+        ----------
+        folders : list[Path]
+            folders no longer covered by a watch
+        """
+        gone = set(folders) & self.Trusted
+        self.Trusted -= gone
+        Distrust(list(gone))
+
+    # endregion
+
+    # region Watch
+    def AddWatch(self, folder: Path) -> None:
+        """Watch a folder for changes, falling back to polling if the kernel refuses.
+
+        Parameters
+        ----------
+        folder : Path
+            folder inside the tree
+        """
+        if self.Libc is None or self.Fd < 0:
+            return
+        wd = self.Libc.inotify_add_watch(self.Fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            # Usually the per user watch limit, rescanning is the only safe option left
+            self.Close()
+            return
+        self.Watches[wd] = folder
+
+    def Open(self) -> None:
+        """Open the inotify descriptor, staying in polling mode where that fails."""
+        if self.Libc is not None:
+            self.Fd = self.Libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            self.Mode = "inotify" if self.Fd >= 0 else "polling"
+
+    def Close(self) -> None:
+        """Drop every watch and close the descriptor, leaving the index to polling."""
+        self.Distrust(list(self.Trusted))
+        self.Watches.clear()
+        if self.Fd >= 0:
+            os.close(self.Fd)
+        self.Fd = -1
+        self.Mode = "polling"
+
+    def HandleEvents(self, data: bytes) -> None:
+        """Apply a buffer of inotify events to the index.
+
+        Parameters
+        ----------
+        data : bytes
+            raw events read from the inotify descriptor
+        """
+        offset = 0
+        overflow = False
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size : offset + EVENT.size + length].rstrip(b"\0")
+            offset += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            folder = self.Watches.get(wd)
+            if folder is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.Watches[wd]
+                self.Distrust([folder])
+                continue
+
+            Invalidate(folder)
+            path = folder / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.AddTree(path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.RemoveTree(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self.RemoveFile(path)
+            else:
+                self.AddFile(path)
+        if overflow:
+            self.Rescan()
+
+    def Run(self) -> None:
+        """Index the tree, then apply events or rescan periodically until stopped."""
+        self.Open()
+        self.Rescan()
+        while not self.Stopped.is_set():
+            if self.Fd < 0:
+                self.Stopped.wait(self.Interval)
+                if not self.Stopped.is_set():
+                    self.Rescan()
+                continue
+            ready, _, _ = select.select([self.Fd], [], [], self.Interval)
+            if ready:
+                with contextlib.suppress(BlockingIOError):
+                    self.HandleEvents(os.read(self.Fd, 1 << 16))
+        self.Close()
+
+    # endregion
+
+    def Series(self, path: Path) -> tuple[dict[str, list[int]], int]:
+        """Answer ScanSeries for a folder inside the watched tree from memory.
+
+        Parameters
+        ----------
+        path : Path
+            folder to report on
+
+        Returns
+        -------
+        tuple[dict[str, list[int]], int]
+            series label -> frame numbers, and the number of files without any digits
+        """
+        series: dict[str, list[int]] = {}
+        with self.Lock:
+            for (folder, label), frames in self.Frames.items():
+                if folder.is_relative_to(path):
+                    prefix = "" if folder == path else f"{folder.relative_to(path).as_posix()}/"
+                    series[prefix + label] = list(frames.elements())
+            unnumbered = sum(n for x, n in self.Unnumbered.items() if x.is_relative_to(path))
+        return series, unnumbered
+
+    def Summary(self) -> str:
+        """Describe the index in one line.
+
+        Returns
+        -------
+        str
+            root, watch mode and totals
+        """
+        with self.Lock:
+            size = sum(self.Files.values())
+            return (
+                f"Watching {self.Root} ({self.Mode}) -> {len(self.Files)} files, "
+                f"{size / 1024**2:.1f} MB, {len(self.Frames)} series"
+            )
+
+
+_INDEXES: dict[Path, FolderIndex] = {}
+
+
+def Watch(root: Path, interval: float = 10.0) -> FolderIndex:
+    """Start indexing a folder tree in the background, reusing a running watch.
+
+    Parameters
+    ----------
+    root : Path
+        folder to watch
+    interval : float, optional
+        seconds between rescans when inotify is unavailable, by default 10.0
+
+    Returns
+    -------
+    FolderIndex
+        live index, ready once its Ready event is set
+    """
+    if root not in _INDEXES:
+        _INDEXES[root] = FolderIndex(root, interval)
+        _INDEXES[root].Thread.start()
+    return _INDEXES[root]
+
+
+def Unwatch(root: Path) -> None:
+    """Stop watching a folder tree, its thread closes the watch in the background.
+
+    Parameters
+    ----------
+    root : Path
+        watched folder
+    """
+    if index := _INDEXES.pop(root, None):
+        index.Stopped.set()
+
+
+def WatchedIndex(path: Path) -> FolderIndex | None:
+    """Find a ready index covering a folder.
+
+    Parameters
+    ----------
+    path : Path
+        folder an operation is about to scan
+
+    Returns
+    -------
+    FolderIndex | None
+        index whose tree contains the folder, None if it is not watched
+    """
+    for root, index in list(_INDEXES.items()):
+        if path.is_relative_to(root) and index.Ready.is_set():
+            return index
+    return None
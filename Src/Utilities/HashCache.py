@@ -0,0 +1,168 @@
+"""Persistent cache of file content hashes.
+
+Entries are keyed on the file path and validated against size, mtime and inode, so an
+unchanged file is never reread. A renamed file is still found through its inode.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+CACHE_PATH: Path = (
+    Path(os.environ.get("LOCALAPPDATA", Path.home() / ".cache")) / "FileOpsGUI" / "hashes.sqlite"
+)
+
+_LOCAL = threading.local()
+
+
+def Connection() -> sqlite3.Connection:
+    """Get the cache connection for the calling thread, creating the database if needed.
+
+    Returns
+    -------
+    sqlite3.Connection
+        thread local connection
+    """
+    conn: sqlite3.Connection | None = getattr(_LOCAL, "conn", None)
+    if conn is None:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "path TEXT, algorithm TEXT, size INTEGER, mtime_ns INTEGER,"
+            " inode INTEGER, device INTEGER, digest BLOB, PRIMARY KEY (path, algorithm))",
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS hashes_inode ON hashes (device, inode, algorithm)",
+        )
+        _LOCAL.conn = conn
+    return conn
+
+
+def LookupHash(path: Path, stat: os.stat_result, algorithm: str) -> bytes | None:
+    """Find a cached digest for a file without reading it.
+
+    Parameters
+    ----------
+    path : Path
+        file to look up
+    stat : os.stat_result
+        current stat of the file
+    algorithm : str
+        digest type
+
+    Returns
+    -------
+    bytes | None
+        cached digest, None if missing or stale
+    """
+    conn = Connection()
+    key = str(path.absolute())
+    row = conn.execute(
+        "SELECT size, mtime_ns, inode, digest FROM hashes WHERE path = ? AND algorithm = ?",
+        (key, algorithm),
+    ).fetchone()
+    if row and row[:3] == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+        return row[3]
+    if row:
+        conn.execute("DELETE FROM hashes WHERE path = ? AND algorithm = ?", (key, algorithm))
+        conn.commit()
+
+    # Files moved by an operation keep their inode, size and mtime
+    if stat.st_ino:
+        moved = conn.execute(
+            "SELECT digest FROM hashes WHERE device = ? AND inode = ? AND algorithm = ?"
+            " AND size = ? AND mtime_ns = ?",
+            (stat.st_dev, stat.st_ino, algorithm, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+        if moved:
+            StoreHash(path, stat, algorithm, moved[0])
+            return moved[0]
+    return None
+
+
+def StoreHash(path: Path, stat: os.stat_result, algorithm: str, digest: bytes) -> None:
+    """Record a digest for a file, replacing any older entry for the same path.
+
+    Parameters
+    ----------
+    path : Path
+        hashed file
+    stat : os.stat_result
+        stat of the file taken before it was read
+    algorithm : str
+        digest type
+    digest : bytes
+        computed digest
+    """
+    conn = Connection()
+    if stat.st_ino:
+        conn.execute(
+            "DELETE FROM hashes WHERE device = ? AND inode = ? AND algorithm = ?",
+            (stat.st_dev, stat.st_ino, algorithm),
+        )
+    conn.execute(
+        "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            str(path.absolute()),
+            algorithm,
+            stat.st_size,
+            stat.st_mtime_ns,
+            stat.st_ino,
+            stat.st_dev,
+            digest,
+        ),
+    )
+    conn.commit()
+
+
+def MoveHash(src: Path, dst: Path) -> None:
+    """Carry cached digests over to a file's new path after a rename.
+
+    Parameters
+    ----------
+    src : Path
+        old file path
+    dst : Path
+        new file path
+    """
+    conn = Connection()
+    conn.execute(
+        "UPDATE OR REPLACE hashes SET path = ? WHERE path = ?",
+        (str(dst.absolute()), str(src.absolute())),
+    )
+    conn.commit()
+
+
+def PruneHashes(root: Path) -> int:
+    """Evict entries below a folder whose files no longer exist.
+
+    Parameters
+    ----------
+    root : Path
+        folder to prune
+
+    Returns
+    -------
+    int
+        number of evicted entries
+    """
+    conn = Connection()
+    prefix = str(root.absolute()).rstrip("\\/") + os.sep
+    # Every path starting with the prefix sorts between it and the prefix with its last
+    # character bumped, a range the primary key index answers directly
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    paths = [
+        row[0]
+        for row in conn.execute(
+            "SELECT DISTINCT path FROM hashes WHERE path >= ? AND path < ?",
+            (prefix, upper),
+        )
+    ]
+    missing = [(path,) for path in paths if not Path(path).is_file()]
+    conn.executemany("DELETE FROM hashes WHERE path = ?", missing)
+    conn.commit()
+    return len(missing)
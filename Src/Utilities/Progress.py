@@ -0,0 +1,107 @@
+"""Structured progress for long running operations.
+
+Operations are generators of status strings, they can also yield a Progress between items.
+The worker turns these into rates and an ETA instead of printing them, and cancelling an
+operation closes its generator at the next yield, so anything that runs for a while should
+yield Progress regularly and release its resources in with or finally blocks.
+"""
+
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class Progress:
+    """Position of a running operation."""
+
+    Done: int
+    Total: int
+    Bytes: int = 0
+    Item: str = ""
+
+
+def FormatDuration(seconds: float) -> str:
+    """Format a duration as hours, minutes and seconds.
+
+    Parameters
+    ----------
+    seconds : float
+        duration, fractions are dropped
+
+    Returns
+    -------
+    str
+        duration as H:MM:SS
+    """
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+
+class ProgressTracker:
+    """Derive throughput and an ETA from successive Progress reports."""
+
+    def __init__(self, interval: float = 0.1) -> None:
+        self.Interval = interval
+        self.Start = time.perf_counter()
+        self.LastReport = 0.0
+        self.Last: Progress | None = None
+
+    def Due(self, progress: Progress) -> bool:
+        """Rate limit reports, always letting the first and last of a run through.
+
+        Parameters
+        ----------
+        progress : Progress
+            latest report
+
+        Returns
+        -------
+        bool
+            true if the report should be shown
+        """
+        now = time.perf_counter()
+        if self.Last is None or progress.Total != self.Last.Total or progress.Done < self.Last.Done:
+            # A new run, or the next file of a multi file operation
+            self.Start = now
+        self.Last = progress
+        if progress.Done >= progress.Total or now - self.LastReport >= self.Interval:
+            self.LastReport = now
+            return True
+        return False
+
+    def Describe(self, progress: Progress) -> str:
+        """Summarise a report with item and byte rates and the time remaining.
+
+        Parameters
+        ----------
+        progress : Progress
+            latest report
+
+        Returns
+        -------
+        str
+            status line
+        """
+        elapsed = max(time.perf_counter() - self.Start, 1e-6)
+        rate = progress.Done / elapsed
+        parts = [f"{progress.Done}/{progress.Total}", f"{rate:.1f}/s"]
+        if progress.Bytes:
+            parts.append(f"{progress.Bytes / 1024**2 / elapsed:.1f} MB/s")
+        if rate > 0 and progress.Done < progress.Total:
+            parts.append(f"ETA {FormatDuration((progress.Total - progress.Done) / rate)}")
+        if progress.Item:
+            parts.append(progress.Item)
+        return " | ".join(parts)
+
+
+def CancelPending(pool: Executor) -> None:
+    """Drop queued work when an operation is closed early, running items still finish.
+
+    Parameters
+    ----------
+    pool : Executor
+        pool the operation submitted to
+    """
+    pool.shutdown(wait=False, cancel_futures=True)
@@ -1,5 +1,7 @@
 """Utility tools for file gui."""
 
+import os
+import re
 from collections.abc import Callable, Generator
 from functools import wraps
 from hashlib import new as newHash
@@ -7,8 +9,13 @@ from pathlib import Path
 from time import time
 from typing import Any
 
+from Src.Utilities.DirSnapshot import RecordRemove, Snapshot
+from Src.Utilities.HashCache import LookupHash, StoreHash
+
 VIDEO_EXTS: list[str] = ["mkv", "mp4", "avi", "webm"]
 IMG_EXTS: list[str] = ["png", "bmp", "webp", "ico", "jpeg", "jpg", "tiff", "heic"]
+SAMPLE_SIZE: int = 64 * 1024
+FRAME_NUMBER: re.Pattern[str] = re.compile(r"^(.*?)(\d+)(\D*)$")
 
 
 def DeleteFolder(path: Path) -> bool:
@@ -20,14 +27,65 @@ def DeleteFolder(path: Path) -> bool:
         else:
             file.unlink()
     path.rmdir()
+    RecordRemove(path)
     return True
 
 
-def ComputeHash(path: Path) -> bytes:
+def ComputeHash(path: Path, useCache: bool = True) -> bytes:
+    """Compute the sha256 of a file, served from the hash cache when the file is unchanged.
+
+    Parameters
+    ----------
+    path : Path
+        file to hash
+    useCache : bool, optional
+        check and update the persistent hash cache, by default True
+
+    Returns
+    -------
+    bytes
+        sha256 digest
+    """
+    stat = path.stat()
+    if useCache and (cached := LookupHash(path, stat, "sha256")):
+        return cached
     h = newHash("sha256")
     with path.open("rb") as f:
-        while chunk := f.read(8196):
+        while chunk := f.read(1 << 20):
             h.update(chunk)
+    if useCache:
+        StoreHash(path, stat, "sha256", h.digest())
+    return h.digest()
+
+
+def ComputeSampleHash(path: Path, useCache: bool = True) -> bytes:
+    """Hash the head and tail of a file, a cheap first pass before a full content hash.
+
+    Files no larger than two samples are read whole, so equal samples mean equal content.
+
+    Parameters
+    ----------
+    path : Path
+        file to hash
+    useCache : bool, optional
+        check and update the persistent hash cache, by default True
+
+    Returns
+    -------
+    bytes
+        sha256 digest of the sampled bytes
+    """
+    stat = path.stat()
+    if useCache and (cached := LookupHash(path, stat, "sample")):
+        return cached
+    h = newHash("sha256")
+    with path.open("rb") as f:
+        h.update(f.read(SAMPLE_SIZE))
+        if stat.st_size > 2 * SAMPLE_SIZE:
+            f.seek(-SAMPLE_SIZE, 2)
+        h.update(f.read(SAMPLE_SIZE))
+    if useCache:
+        StoreHash(path, stat, "sample", h.digest())
     return h.digest()
 
 
@@ -60,6 +118,29 @@ def GenerateMessage(message: str) -> Generator[str]:
     yield message
 
 
+def GenerateResult(func: Callable[..., str], *args: Any, **kwargs: Any) -> Generator[str]:
+    """Call a function returning a message once the generator is first advanced.
+
+    The arguments are bound when this is called, so a run button reads its inputs as the
+    job is queued while the work itself waits for the worker thread.
+
+    Parameters
+    ----------
+    func : Callable[..., str]
+        operation returning a status string
+    *args : Any
+        positional arguments for func
+    **kwargs : Any
+        keyword arguments for func
+
+    Yields
+    ------
+    Generator[str]
+        the status string
+    """
+    yield func(*args, **kwargs)
+
+
 def CheckAgainstList(item: Any, tags: list[str]) -> bool:
     return any(tag in str(item) for tag in tags)
 
@@ -96,31 +177,130 @@ def GetAllVideos(inputPath: Path) -> list[Path]:
     if inputPath.is_file():
         outList = [inputPath]
     else:
+        snapshot = Snapshot(inputPath)
         for ext in VIDEO_EXTS:
-            outList += list(inputPath.glob(f"*.{ext}"))
+            outList += snapshot.Glob(f"*.{ext}")
     return outList
 
 
-def GenerateUniqueName(filePath: Path) -> Path:
+class NameIndex:
+    """Names in a single folder, taken from its snapshot and kept current by the caller.
+
+    Lookups and unique name allocation never touch the filesystem, so callers must record
+    every entry they create, rename or remove in the folder through Add, Move and Remove.
+    Names are compared with os.path.normcase, matching the case rules of exists on Windows.
+    """
+
+    def __init__(self, folder: Path) -> None:
+        self.Folder = folder
+        self.Names: set[str] = {os.path.normcase(x) for x in Snapshot(folder).Entries}
+        self.NextCount: dict[str, int] = {}
+
+    def __contains__(self, name: str) -> bool:
+        """Check if a name is taken in the folder."""
+        return os.path.normcase(name) in self.Names
+
+    def Add(self, name: str) -> None:
+        """Record a new entry in the folder.
+
+        Parameters
+        ----------
+        name : str
+            created file or folder name
+        """
+        self.Names.add(os.path.normcase(name))
+
+    def Remove(self, name: str) -> None:
+        """Record an entry leaving the folder.
+
+        Parameters
+        ----------
+        name : str
+            removed file or folder name
+        """
+        self.Names.discard(os.path.normcase(name))
+
+    def Move(self, src: str, dst: str) -> None:
+        """Record a rename within the folder.
+
+        Parameters
+        ----------
+        src : str
+            old name
+        dst : str
+            new name
+        """
+        self.Remove(src)
+        self.Add(dst)
+
+    def Unique(self, name: str) -> Path:
+        """Reserve a free name in the folder, numbering the stem if the name is taken.
+
+        Parameters
+        ----------
+        name : str
+            wanted file name
+
+        Returns
+        -------
+        Path
+            free path in the folder (name, name 001, name 002...), recorded as taken
+        """
+        outName = name
+        if outName in self:
+            stem, suffix = Path(name).stem, Path(name).suffix
+            key = os.path.normcase(name)
+            count = self.NextCount.get(key, 1)
+            while (outName := f"{stem} {count:03d}{suffix}") in self:
+                count += 1
+            self.NextCount[key] = count + 1
+        self.Add(outName)
+        return self.Folder / outName
+
+
+def GenerateUniqueName(filePath: Path, index: NameIndex | None = None) -> Path:
     """Generate a unique filename for a file if it already exists.
 
     Parameters
     ----------
     filePath : Path
         file path to test
+    index : NameIndex | None, optional
+        index of the parent folder, reserves the name without any stat calls, by default None
 
     Returns
     -------
     Path
         unique file path
     """
+    if index is not None:
+        return index.Unique(filePath.name)
     count = 1
     outPath: Path = filePath
     while outPath.exists():
-        outPath = outPath.parent / f"{outPath.stem} {count:03d}{outPath.suffix}"
+        outPath = filePath.parent / f"{filePath.stem} {count:03d}{filePath.suffix}"
         count += 1
     return outPath
 
 
-def DigitizeStr(inString: str) -> int:
-    return int("".join([char for char in inString if char.isnumeric()]))
+def SplitFrameName(name: str) -> tuple[str, int] | None:
+    """Split a file name into its series label and frame number.
+
+    The last run of digits in the stem is the frame number, so "v2_shot_0001.exr" is frame
+    1 of "v2_shot_#.exr" and digits in the extension are never read as a frame.
+
+    Parameters
+    ----------
+    name : str
+        file name
+
+    Returns
+    -------
+    tuple[str, int] | None
+        series label and frame number, None if the stem has no digits
+    """
+    dot = name.rfind(".")
+    stem, suffix = (name[:dot], name[dot:]) if dot > 0 else (name, "")
+    if match := FRAME_NUMBER.match(stem):
+        return f"{match.group(1)}#{match.group(3)}{suffix}", int(match.group(2))
+    return None
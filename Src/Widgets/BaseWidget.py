@@ -1,9 +1,9 @@
 """Base widget which gui in built on."""
 
 from collections.abc import Callable
+from pathlib import Path
 from typing import Any
 
-from PyQt6.QtCore import QThread, pyqtSignal
 from PyQt6.QtWidgets import (
     QFileDialog,
     QFrame,
@@ -11,37 +11,23 @@ from PyQt6.QtWidgets import (
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QProgressBar,
     QPushButton,
     QRadioButton,
-    QTextEdit,
     QVBoxLayout,
     QWidget,
 )
 
-
-class WorkerThread(QThread):
-    """Ability to do things away from gui thread."""
-
-    resultReady = pyqtSignal(str)
-
-    def __init__(self, connection: Callable) -> None:
-        super().__init__()
-        self.connection = connection
-
-    def run(self) -> None:
-        try:
-            for result in self.connection():
-                self.resultReady.emit(result)
-        except Exception as e:
-            self.resultReady.emit(f"Error Occurred {e}")
+from Src.Utilities.Progress import FormatDuration
+from Src.Widgets.JobScheduler import Job, SharedScheduler, WorkerThread
+from Src.Widgets.OutputConsole import OutputConsole
 
 
 class BaseWidget(QWidget):
     """Base widget for FileOpsGui."""
 
     MainFolderInput: QLineEdit
-    OutputText: QTextEdit
-    Worker: WorkerThread
+    OutputText: OutputConsole
 
     def __init__(self, parent: QWidget) -> None:
         QWidget.__init__(self, parent=parent)
@@ -100,6 +86,7 @@ class BaseWidget(QWidget):
 
     def BuildBaseFrame(self, title: str, caption: str) -> tuple[QFrame, QVBoxLayout]:
         funcFrame = QFrame(self)
+        funcFrame.setObjectName(title)
         inputFrameLayout = QVBoxLayout(funcFrame)
 
         titleLabel = QLabel(funcFrame)
@@ -121,8 +108,9 @@ class BaseWidget(QWidget):
         masterFrame: QFrame,
         masterLayout: QHBoxLayout | QVBoxLayout,
         connection: Callable,
+        kind: str = "io",
     ) -> None:
-        """Build a run button hooked to a command.
+        """Build a run button which queues a command on the shared job scheduler.
 
         Parameters
         ----------
@@ -131,24 +119,75 @@ class BaseWidget(QWidget):
         masterLayout : QHBoxLayout | QVBoxLayout
             parent layout for control
         connection : Callable
-            linked method for control, ideally returns a generator
+            linked method for control, ideally returns a generator of messages and Progress
+        kind : str, optional
+            "cpu" or "io", the scheduler limit the command counts against, by default "io"
         """
-        runButton = QPushButton("Run", masterFrame)
-
-        def displayResult(result: str) -> None:
-            currentText = self.OutputText.toPlainText()
-            self.OutputText.setText(f"{currentText}\n{result}")
-            if vBar := self.OutputText.verticalScrollBar():
-                vBar.setValue(vBar.maximum())
+        buttonFrame = QFrame(masterFrame)
+        buttonLayout = QHBoxLayout(buttonFrame)
+        runButton = QPushButton("Run", buttonFrame)
+        cancelButton = QPushButton("Cancel", buttonFrame)
+        cancelButton.setEnabled(False)
+        progressBar = QProgressBar(masterFrame)
+        progressBar.setVisible(False)
+        statusLabel = QLabel(masterFrame)
+        jobs: list[Job] = []
+
+        def displayProgress(done: int, total: int, description: str) -> None:
+            progressBar.setVisible(True)
+            progressBar.setRange(0, max(total, 1))
+            progressBar.setValue(min(done, max(total, 1)))
+            statusLabel.setText(description)
+
+        def finished(job: Job, outcome: str) -> None:
+            self.OutputText.Append(f"{job.Name} -> {outcome} in {FormatDuration(job.Runtime)}")
+            if job in jobs:
+                jobs.remove(job)
+            cancelButton.setEnabled(bool(jobs))
+
+        def cancelled(job: Job) -> None:
+            # Queued jobs can be cancelled here or from the jobs page
+            if job in jobs:
+                jobs.remove(job)
+                self.OutputText.Append(f"{job.Name} -> Cancelled")
+                statusLabel.setText(f"Cancelled {job.Name}")
+                cancelButton.setEnabled(bool(jobs))
 
         def startWorker() -> None:
-            self.Worker = WorkerThread(connection)
-            self.Worker.resultReady.connect(displayResult)
-            self.Worker.start()
-            self.Worker.setPriority(QThread.Priority.HighestPriority)
-
+            folder = Path(self.ActiveField)
+            try:
+                # Calling now binds the inputs as they are when the job is queued
+                results = connection()
+            except Exception as e:
+                self.OutputText.Append(f"Error Occurred {e}")
+                return
+            worker = WorkerThread(lambda: results)
+            job = Job(f"{masterFrame.objectName()} -> {folder.name}", folder, kind, worker)
+            worker.resultReady.connect(self.OutputText.Append)
+            worker.progressReady.connect(displayProgress)
+            worker.started.connect(lambda: statusLabel.setText(f"Running {job.Name}"))
+            worker.finished.connect(lambda: finished(job, worker.Outcome))
+            jobs.append(job)
+            progressBar.setVisible(False)
+            statusLabel.setText(f"Queued {job.Name}")
+            cancelButton.setEnabled(True)
+            SharedScheduler().Submit(job)
+
+        def cancelWorker() -> None:
+            statusLabel.setText("Cancelling...")
+            cancelButton.setEnabled(False)
+            # Copied, queued jobs leave the list as they are cancelled
+            for job in jobs.copy():
+                SharedScheduler().Cancel(job)
+
+        SharedScheduler().jobCancelled.connect(cancelled)
         runButton.clicked.connect(startWorker)
-        masterLayout.addWidget(runButton)
+        cancelButton.clicked.connect(cancelWorker)
+        buttonLayout.addWidget(runButton)
+        buttonLayout.addWidget(cancelButton)
+        masterLayout.addWidget(buttonFrame)
+        masterLayout.addWidget(progressBar)
+        masterLayout.addWidget(statusLabel)
 
     def AddButtonFrame(
         self,
@@ -1,18 +1,31 @@
 """Widget for image manipulation, essentially the homepage."""
 
+import os
 from collections.abc import Generator
 from pathlib import Path
 
-from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QComboBox, QDoubleSpinBox, QLabel, QLineEdit, QTextEdit, QWidget
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtWidgets import (
+    QComboBox,
+    QDoubleSpinBox,
+    QFrame,
+    QLabel,
+    QLineEdit,
+    QPushButton,
+    QSpinBox,
+    QWidget,
+)
 
 from Src.Images.FixNames import FixNames
-from Src.Images.FolderTools import Flatten, SortToFolders
+from Src.Images.FolderTools import FindDuplicates, Flatten, SortToFolders
 from Src.Images.ImageSequences import DecompileGIF, DecompilePDF, DecompileVideo
 from Src.Images.PDFTools import CompileFolders
 from Src.Images.TrimEdges import TrimAllEdges
+from Src.Utilities.FolderWatch import FolderIndex, Unwatch, Watch
+from Src.Utilities.Progress import Progress
 from Src.Utilities.UtilityTools import GenerateMessage
 from Src.Widgets.BaseWidget import BaseWidget
+from Src.Widgets.OutputConsole import OutputConsole
 
 
 class ImageWidget(BaseWidget):
@@ -21,7 +34,7 @@ class ImageWidget(BaseWidget):
     def __init__(self, parent: QWidget) -> None:
         super().__init__(parent)
 
-        self.OutputText = QTextEdit(self)
+        self.OutputText = OutputConsole(self, self.CleanName)
         self.OutputText.setMinimumHeight(200)
 
         masterFolderLabel = QLabel(self)
@@ -30,6 +43,7 @@ class ImageWidget(BaseWidget):
 
         self.MainFolderInput = QLineEdit(self)
         inputFrame = self.BuildInputFrame(self.MainFolderInput)
+        self.BuildWatchButton(inputFrame)
 
         self.Layout.addWidget(masterFolderLabel, 0, 0, 1, 7)
         self.Layout.addWidget(self.OutputText, 10, 0, 1, 7)
@@ -40,11 +54,62 @@ class ImageWidget(BaseWidget):
 
         self.BuildSortFolderFrame(4, 3)
         self.BuildFlattenFrame(4, 6)
+        self.BuildDuplicatesFrame(0, 3)
 
         self.BuildCompilePDFFrame(6, 3)
         self.BuildDecompileFrame(6, 6)
 
+    def ToggleWatch(self, checked: bool) -> None:
+        """Start or stop the live index of the master folder.
+
+        Parameters
+        ----------
+        checked : bool
+            true to start watching the current master folder
+        """
+        if checked and Path(self.ActiveField).is_dir():
+            self.WatchedFolder = Path(self.ActiveField)
+            self.WatchIndex = Watch(self.WatchedFolder)
+            self.OutputText.Append(f"Indexing {self.WatchedFolder}")
+            # The first walk runs on the watcher's thread, report it once it is done
+            self.WatchTimer.start()
+        elif self.WatchedFolder is not None:
+            self.WatchTimer.stop()
+            self.WatchIndex = None
+            Unwatch(self.WatchedFolder)
+            self.OutputText.Append(f"Stopped watching {self.WatchedFolder}")
+            self.WatchedFolder = None
+
+    def ReportWatch(self) -> None:
+        """Print the summary of the watched folder once its first walk is done."""
+        if self.WatchIndex is None:
+            self.WatchTimer.stop()
+        elif self.WatchIndex.Ready.is_set():
+            self.WatchTimer.stop()
+            self.OutputText.Append(self.WatchIndex.Summary())
+
     # region Constructors
+    def BuildWatchButton(self, inputFrame: QFrame) -> None:
+        """Add a toggle to the master folder input that watches the folder while checked.
+
+        Parameters
+        ----------
+        inputFrame : QFrame
+            frame holding the master folder input
+        """
+        self.WatchedFolder: Path | None = None
+        self.WatchIndex: FolderIndex | None = None
+        self.WatchTimer = QTimer(self)
+        self.WatchTimer.setInterval(200)
+        self.WatchTimer.timeout.connect(self.ReportWatch)
+        watchButton = QPushButton("Watch", inputFrame)
+        watchButton.setCheckable(True)
+        watchButton.setToolTip("Keep an index of the master folder up to date while open")
+        watchButton.toggled.connect(self.ToggleWatch)
+        self.MainFolderInput.textChanged.connect(lambda: watchButton.setChecked(False))
+        if layout := inputFrame.layout():
+            layout.addWidget(watchButton)
+
     def BuildSortFolderFrame(self, columnIdx: int, rowIdx: int) -> None:
         frame, layout = self.BuildBaseFrame(
             title="Sort To Folders",
@@ -71,17 +136,50 @@ class ImageWidget(BaseWidget):
         globPattern.setPlaceholderText("Glob Pattern")
         layout.addWidget(globPattern)
 
-        def RunAction() -> Generator[str]:
+        workerBox = QSpinBox(frame)
+        workerBox.setPrefix("Threads: ")
+        workerBox.setRange(1, 32)
+        workerBox.setValue(8)
+        layout.addWidget(workerBox)
+
+        def RunAction() -> Generator[str | Progress]:
             return Flatten(
                 Path(self.ActiveField),
                 rename.isChecked(),
                 delete.isChecked(),
                 globPattern=globPattern.text() if globPattern.text() else "**/*.*",
+                workers=workerBox.value(),
             )
 
         self.BuildRunButton(frame, layout, RunAction)
         self.Layout.addWidget(frame, rowIdx, columnIdx, 3, 1)
 
+    def BuildDuplicatesFrame(self, columnIdx: int, rowIdx: int) -> None:
+        """Build frame to find duplicate files.
+
+        Parameters
+        ----------
+        columnIdx : int
+            column to place the frame inside
+        rowIdx : int
+            row to place frame on
+
+        """
+        frame, layout = self.BuildBaseFrame(
+            title="Find Duplicates",
+            caption="Find identical files across the folder tree",
+        )
+
+        resolution = QComboBox(frame)
+        resolution.addItems(["Report", "Hardlink", "Delete"])
+        layout.addWidget(resolution)
+
+        def RunAction() -> Generator[str | Progress]:
+            return FindDuplicates(Path(self.ActiveField), resolution.currentText())
+
+        self.BuildRunButton(frame, layout, RunAction)
+        self.Layout.addWidget(frame, rowIdx, columnIdx, 3, 1)
+
     def BuildCompilePDFFrame(self, columnIdx: int, rowIdx: int) -> None:
         frame, layout = self.BuildBaseFrame(
             title="Compile To PDF",
@@ -93,13 +191,20 @@ class ImageWidget(BaseWidget):
         resolutionBox.setValue(100.0)
         layout.addWidget(resolutionBox)
 
-        def RunAction() -> Generator[str]:
+        workerBox = QSpinBox(frame)
+        workerBox.setPrefix("Workers: ")
+        workerBox.setRange(1, os.cpu_count() or 1)
+        workerBox.setValue(os.cpu_count() or 1)
+        layout.addWidget(workerBox)
+
+        def RunAction() -> Generator[str | Progress]:
             return CompileFolders(
                 Path(self.ActiveField),
                 resolutionBox.value(),
+                workers=workerBox.value(),
             )
 
-        self.BuildRunButton(frame, layout, RunAction)
+        self.BuildRunButton(frame, layout, RunAction, kind="cpu")
         self.Layout.addWidget(frame, rowIdx, columnIdx, 3, 1)
 
     def BuildFixNamesFrame(self, columnIdx: int, rowIdx: int) -> None:
@@ -112,7 +217,7 @@ class ImageWidget(BaseWidget):
         globFilter.setPlaceholderText("Glob Pattern")
         layout.addWidget(globFilter)
 
-        def RunAction() -> Generator[str]:
+        def RunAction() -> Generator[str | Progress]:
             return FixNames(
                 Path(self.ActiveField),
                 globFilter.text() if globFilter.text() != "" else "*.*",
@@ -142,21 +247,58 @@ class ImageWidget(BaseWidget):
         layout.addWidget(decompileOptions)
 
         makeDir = self.AddButtonFrame(frame, layout, "Create SubDir")
-
-        def RunAction() -> Generator[str]:
+        extractImages = self.AddButtonFrame(frame, layout, "Extract PDF Images")
+
+        dpiBox = QSpinBox(frame)
+        dpiBox.setPrefix("PDF DPI: ")
+        dpiBox.setRange(36, 1200)
+        dpiBox.setValue(200)
+        layout.addWidget(dpiBox)
+
+        heightBox = QSpinBox(frame)
+        heightBox.setPrefix("PDF Height: ")
+        heightBox.setSuffix(" px")
+        heightBox.setSpecialValueText("PDF Height: From DPI")
+        heightBox.setMaximum(20000)
+        layout.addWidget(heightBox)
+
+        fpsBox = QDoubleSpinBox(frame)
+        fpsBox.setPrefix("Video FPS: ")
+        fpsBox.setSpecialValueText("Video FPS: All Frames")
+        fpsBox.setMaximum(240.0)
+        layout.addWidget(fpsBox)
+
+        sceneBox = QDoubleSpinBox(frame)
+        sceneBox.setPrefix("Scene Threshold: ")
+        sceneBox.setSpecialValueText("Scene Threshold: Off")
+        sceneBox.setMaximum(255.0)
+        layout.addWidget(sceneBox)
+
+        def RunAction() -> Generator[str | Progress]:
             match decompileOptions.currentText():
                 case "GIF":
                     return DecompileGIF(Path(self.ActiveField), makeDir.isChecked())
                 case "PDF":
-                    return DecompilePDF(Path(self.ActiveField), makeDir.isChecked())
+                    return DecompilePDF(
+                        Path(self.ActiveField),
+                        makeDir.isChecked(),
+                        dpi=dpiBox.value(),
+                        height=heightBox.value() or None,
+                        extractImages=extractImages.isChecked(),
+                    )
                 case "VIDEO":
-                    return DecompileVideo(Path(self.ActiveField), makeDir.isChecked())
+                    return DecompileVideo(
+                        Path(self.ActiveField),
+                        makeSubDir=makeDir.isChecked(),
+                        targetFps=fpsBox.value(),
+                        sceneThreshold=sceneBox.value(),
+                    )
                 case _others:
                     return GenerateMessage(
                         f"Invalid selection {decompileOptions.currentText()}",
                     )
 
-        self.BuildRunButton(frame, layout, RunAction)
+        self.BuildRunButton(frame, layout, RunAction, kind="cpu")
 
         self.Layout.addWidget(frame, rowIdx, columnIdx, 3, 1)
 
@@ -180,13 +322,20 @@ class ImageWidget(BaseWidget):
         trimColor.setPlaceholderText("Color Array")
         layout.addWidget(trimColor)
 
-        def RunAction() -> Generator[str]:
+        workerBox = QSpinBox(frame)
+        workerBox.setPrefix("Workers: ")
+        workerBox.setRange(1, os.cpu_count() or 1)
+        workerBox.setValue(os.cpu_count() or 1)
+        layout.addWidget(workerBox)
+
+        def RunAction() -> Generator[str | Progress]:
             return TrimAllEdges(
                 Path(self.ActiveField),
                 trimColor.text() if trimColor.text() != "" else None,
+                workers=workerBox.value(),
             )
 
-        self.BuildRunButton(frame, layout, RunAction)
+        self.BuildRunButton(frame, layout, RunAction, kind="cpu")
 
         self.Layout.addWidget(frame, rowIdx, columnIdx, 3, 1)
 
@@ -0,0 +1,254 @@
+"""Queue of jobs shared by every page, run on worker threads within configurable limits."""
+
+import contextlib
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+from Src.Utilities.Progress import Progress, ProgressTracker
+
+
+class WorkerThread(QThread):
+    """Ability to do things away from gui thread."""
+
+    resultReady = pyqtSignal(str)
+    progressReady = pyqtSignal(int, int, str)
+
+    def __init__(self, connection: Callable) -> None:
+        super().__init__()
+        self.connection = connection
+        self.Outcome = "Finished"
+
+    def run(self) -> None:
+        """Drain the connection's messages, forwarding progress at a steady rate."""
+        tracker = ProgressTracker()
+        results = None
+        try:
+            results = self.connection()
+            for result in results:
+                if isinstance(result, Progress):
+                    if tracker.Due(result):
+                        self.progressReady.emit(result.Done, result.Total, tracker.Describe(result))
+                else:
+                    self.resultReady.emit(result)
+                if self.isInterruptionRequested():
+                    self.Outcome = "Cancelled"
+                    self.resultReady.emit("Cancelled")
+                    break
+        except Exception as e:
+            self.Outcome = "Failed"
+            self.resultReady.emit(f"Error Occurred {e}")
+        finally:
+            # Raises GeneratorExit at the paused yield so the operation can clean up
+            if hasattr(results, "close"):
+                try:
+                    results.close()
+                except Exception as e:
+                    self.Outcome = "Failed"
+                    self.resultReady.emit(f"Error Occurred {e}")
+
+
+def DeviceOf(path: Path) -> int | None:
+    """Find the device a path lives on, from its nearest existing parent.
+
+    Parameters
+    ----------
+    path : Path
+        folder a job works in
+
+    Returns
+    -------
+    int | None
+        device id, None if no part of the path exists
+    """
+    for folder in (path, *path.parents):
+        with contextlib.suppress(OSError):
+            return folder.stat().st_dev
+    return None
+
+
+@dataclass(eq=False)
+class Job:
+    """One queued run of an operation."""
+
+    Name: str
+    Folder: Path
+    Kind: str
+    Worker: WorkerThread | None
+    Device: int | None = None
+    Resolved: bool = False
+    Status: str = "Queued"
+    Queued: float = field(default_factory=time.time)
+    Started: float | None = None
+    Finished: float | None = None
+
+    @property
+    def Wait(self) -> float:
+        """Seconds spent queued, up to now while still waiting."""
+        return (self.Started or self.Finished or time.time()) - self.Queued
+
+    @property
+    def Runtime(self) -> float:
+        """Seconds spent running, 0 if the job never started."""
+        if self.Started is None:
+            return 0.0
+        return (self.Finished or time.time()) - self.Started
+
+
+class JobScheduler(QObject):
+    """Start queued jobs in order while the CPU, I/O and per device limits allow.
+
+    Jobs are "cpu" or "io" bound and each kind has its own limit of running jobs. Every
+    job also counts against the device of its folder, and a job waiting on a device holds
+    back later jobs on the same device, so work queued against one disk runs in order. A
+    job whose device is still being looked up holds back every job queued after it.
+    """
+
+    jobsChanged = pyqtSignal()
+    jobCancelled = pyqtSignal(object)
+    deviceFound = pyqtSignal(object, object)
+
+    def __init__(self, cpuLimit: int = 1, ioLimit: int = 2, deviceLimit: int = 1) -> None:
+        super().__init__()
+        self.CpuLimit = cpuLimit
+        self.IoLimit = ioLimit
+        self.DeviceLimit = deviceLimit
+        self.Jobs: list[Job] = []
+        self.deviceFound.connect(self.SetDevice)
+
+    def Submit(self, job: Job) -> None:
+        """Queue a job, starting it once its device is known and nothing is in its way.
+
+        The device is looked up on a thread of its own, as a stat of an unreachable network
+        path can hang for a long time.
+
+        Parameters
+        ----------
+        job : Job
+            job whose worker has its signals connected but is not started
+        """
+        if job.Worker is not None:
+            job.Worker.finished.connect(lambda: self.Finish(job))
+        self.Jobs.append(job)
+        threading.Thread(
+            target=lambda: self.deviceFound.emit(job, DeviceOf(job.Folder)),
+            name=f"Device {job.Name}",
+            daemon=True,
+        ).start()
+        self.jobsChanged.emit()
+
+    def SetDevice(self, job: Job, device: int | None) -> None:
+        """Record the device found for a job and see if it can start.
+
+        Parameters
+        ----------
+        job : Job
+            submitted job
+        device : int | None
+            device of its folder
+        """
+        job.Device = device
+        job.Resolved = True
+        self.Pump()
+
+    def Cancel(self, job: Job) -> None:
+        """Drop a queued job, or ask a running one to stop at its next message.
+
+        Dropped jobs are announced through jobCancelled, running ones end through their
+        worker like any other run.
+
+        Parameters
+        ----------
+        job : Job
+            job to cancel
+        """
+        if job.Status == "Queued":
+            job.Status = "Cancelled"
+            job.Finished = time.time()
+            self.Release(job)
+            self.jobCancelled.emit(job)
+            self.Pump()
+        elif job.Status == "Running" and job.Worker is not None:
+            job.Worker.requestInterruption()
+
+    def Finish(self, job: Job) -> None:
+        """Record how a job's worker ended and start whatever it was holding back.
+
+        Parameters
+        ----------
+        job : Job
+            job whose worker finished
+        """
+        if job.Worker is not None:
+            job.Status = job.Worker.Outcome
+        job.Finished = time.time()
+        self.Release(job)
+        self.Pump()
+
+    @staticmethod
+    def Release(job: Job) -> None:
+        """Free the worker of a job that will not run again, its timings stay listed.
+
+        Parameters
+        ----------
+        job : Job
+            finished or cancelled job
+        """
+        if job.Worker is not None:
+            job.Worker.deleteLater()
+            job.Worker = None
+
+    def ClearFinished(self) -> None:
+        """Drop every job that is no longer queued or running from the list."""
+        self.Jobs = [x for x in self.Jobs if x.Status in ["Queued", "Running"]]
+        self.jobsChanged.emit()
+
+    def Pump(self) -> None:
+        """Start every queued job that fits within the limits, oldest first."""
+        running = [x for x in self.Jobs if x.Status == "Running"]
+        kinds = Counter(x.Kind for x in running)
+        devices = Counter(x.Device for x in running if x.Device is not None)
+        blocked: set[int] = set()
+        for job in [x for x in self.Jobs if x.Status == "Queued"]:
+            if not job.Resolved:
+                # Any later job could share its device, nothing may overtake it
+                break
+            if job.Worker is None:
+                continue
+            limit = self.CpuLimit if job.Kind == "cpu" else self.IoLimit
+            if job.Device is not None and (
+                job.Device in blocked or devices[job.Device] >= self.DeviceLimit
+            ):
+                blocked.add(job.Device)
+                continue
+            if kinds[job.Kind] >= limit:
+                if job.Device is not None:
+                    blocked.add(job.Device)
+                continue
+
+            job.Status = "Running"
+            job.Started = time.time()
+            kinds[job.Kind] += 1
+            if job.Device is not None:
+                devices[job.Device] += 1
+            job.Worker.start()
+            job.Worker.setPriority(QThread.Priority.HighestPriority)
+        self.jobsChanged.emit()
+
+
+@cache
+def SharedScheduler() -> JobScheduler:
+    """Get the scheduler every page submits to, created on first use.
+
+    Returns
+    -------
+    JobScheduler
+        application wide scheduler
+    """
+    return JobScheduler()
@@ -0,0 +1,149 @@
+"""Job list widget."""
+
+import time
+from collections.abc import Callable
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QFrame,
+    QHBoxLayout,
+    QPushButton,
+    QSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QWidget,
+)
+
+from Src.Utilities.Progress import FormatDuration
+from Src.Widgets.BaseWidget import BaseWidget
+from Src.Widgets.JobScheduler import Job, SharedScheduler
+
+COLUMNS = ["Job", "Folder", "Kind", "Status", "Queued", "Wait", "Run Time"]
+
+
+class JobWidget(BaseWidget):
+    """Queued, running and finished jobs from every page, and the limits they run under."""
+
+    def __init__(self, parent: QWidget) -> None:
+        super().__init__(parent)
+        self.Scheduler = SharedScheduler()
+
+        self.JobTable = QTableWidget(0, len(COLUMNS), self)
+        self.JobTable.setHorizontalHeaderLabels(COLUMNS)
+        self.JobTable.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.JobTable.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        if header := self.JobTable.horizontalHeader():
+            header.setStretchLastSection(True)
+
+        self.Layout.addWidget(self.BuildLimitFrame(), 0, 0, 1, 7)
+        self.Layout.addWidget(self.JobTable, 1, 0, 1, 7)
+
+        # Running times tick over between scheduler updates
+        self.Timer = QTimer(self)
+        self.Timer.setInterval(1000)
+        self.Timer.timeout.connect(self.Refresh)
+        self.Timer.start()
+        self.Scheduler.jobsChanged.connect(self.Refresh)
+
+    # region Constructors
+    def BuildLimitFrame(self) -> QFrame:
+        """Build the frame with the scheduler limits and the job list buttons.
+
+        Returns
+        -------
+        QFrame
+            limit frame
+        """
+        frame, layout = self.BuildBaseFrame(
+            title="Jobs",
+            caption="Runs queue here from every page, oldest first within the limits below",
+        )
+        limitFrame = QFrame(frame)
+        limitLayout = QHBoxLayout(limitFrame)
+
+        def AddLimit(prefix: str, value: int, apply: Callable[[int], None]) -> None:
+            box = QSpinBox(limitFrame)
+            box.setPrefix(prefix)
+            box.setRange(1, 64)
+            box.setValue(value)
+            box.valueChanged.connect(apply)
+            limitLayout.addWidget(box)
+
+        AddLimit("CPU jobs: ", self.Scheduler.CpuLimit, self.SetCpuLimit)
+        AddLimit("I/O jobs: ", self.Scheduler.IoLimit, self.SetIoLimit)
+        AddLimit("Jobs per device: ", self.Scheduler.DeviceLimit, self.SetDeviceLimit)
+
+        cancelButton = QPushButton("Cancel Selected", limitFrame)
+        cancelButton.clicked.connect(self.CancelSelected)
+        clearButton = QPushButton("Clear Finished", limitFrame)
+        clearButton.clicked.connect(self.Scheduler.ClearFinished)
+        limitLayout.addWidget(cancelButton)
+        limitLayout.addWidget(clearButton)
+
+        layout.addWidget(limitFrame)
+        return frame
+
+    # endregion
+
+    # region Actions
+    def SetCpuLimit(self, value: int) -> None:
+        """Change how many cpu bound jobs run at once."""
+        self.Scheduler.CpuLimit = value
+        self.Scheduler.Pump()
+
+    def SetIoLimit(self, value: int) -> None:
+        """Change how many I/O bound jobs run at once."""
+        self.Scheduler.IoLimit = value
+        self.Scheduler.Pump()
+
+    def SetDeviceLimit(self, value: int) -> None:
+        """Change how many jobs run at once on one device."""
+        self.Scheduler.DeviceLimit = value
+        self.Scheduler.Pump()
+
+    def CancelSelected(self) -> None:
+        """Cancel the jobs on the selected rows."""
+        jobs = list(self.Scheduler.Jobs)
+        rows = {x.row() for x in self.JobTable.selectedIndexes()}
+        for row in sorted(rows):
+            if row < len(jobs):
+                self.Scheduler.Cancel(jobs[row])
+
+    # endregion
+
+    def Refresh(self) -> None:
+        """Update the table from the scheduler, only touching cells whose text changed."""
+        jobs = self.Scheduler.Jobs
+        self.JobTable.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            for column, text in enumerate(self.JobRow(job)):
+                item = self.JobTable.item(row, column)
+                if item is None:
+                    self.JobTable.setItem(row, column, QTableWidgetItem(text))
+                elif item.text() != text:
+                    item.setText(text)
+
+    @staticmethod
+    def JobRow(job: Job) -> list[str]:
+        """Format a job as the cells of one table row.
+
+        Parameters
+        ----------
+        job : Job
+            job to show
+
+        Returns
+        -------
+        list[str]
+            text per column of COLUMNS
+        """
+        return [
+            job.Name,
+            str(job.Folder),
+            job.Kind,
+            job.Status,
+            time.strftime("%H:%M:%S", time.localtime(job.Queued)),
+            FormatDuration(job.Wait),
+            FormatDuration(job.Runtime),
+        ]
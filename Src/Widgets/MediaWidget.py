@@ -3,11 +3,13 @@
 from collections.abc import Generator
 
 from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QFrame, QHBoxLayout, QLabel, QLineEdit, QRadioButton, QTextEdit, QWidget
+from PyQt6.QtWidgets import QFrame, QHBoxLayout, QLabel, QLineEdit, QRadioButton, QWidget
 
 from Src.Media.GetEpisodeTitles import LoadEpisodes
 from Src.Media.Titles import AppendTitles, RunTitleEdit
+from Src.Utilities.UtilityTools import GenerateResult
 from Src.Widgets.BaseWidget import BaseWidget
+from Src.Widgets.OutputConsole import OutputConsole
 
 
 class MediaWidget(BaseWidget):
@@ -15,7 +17,7 @@ class MediaWidget(BaseWidget):
 
     def __init__(self, parent: QWidget) -> None:
         super().__init__(parent)
-        self.OutputText = QTextEdit(self)
+        self.OutputText = OutputConsole(self, self.CleanName)
         masterFolderLabel = QLabel(self)
         masterFolderLabel.setText("<h1>Master Folder</h1>")
         self.MainFolderInput = QLineEdit(self)
@@ -47,7 +49,8 @@ class MediaWidget(BaseWidget):
         layout.addWidget(episodeFrame)
 
         def RunAction() -> Generator[str]:
-            yield AppendTitles(
+            return GenerateResult(
+                AppendTitles,
                 self.ActiveField,
                 self.AppendTitle.text(),
                 self.EpisodeFolder.text(),
@@ -76,7 +79,11 @@ class MediaWidget(BaseWidget):
         layout.addWidget(showFrame)
 
         def RunAction() -> Generator[str]:
-            yield LoadEpisodes(topic=self.ContentTitle.text(), _isShow=self.IsShow.isChecked())
+            return GenerateResult(
+                LoadEpisodes,
+                topic=self.ContentTitle.text(),
+                _isShow=self.IsShow.isChecked(),
+            )
 
         self.BuildRunButton(frame, layout, RunAction)
 
@@ -89,7 +96,7 @@ class MediaWidget(BaseWidget):
         )
 
         def RunAction() -> Generator[str]:
-            yield RunTitleEdit(self.ActiveField)
+            return GenerateResult(RunTitleEdit, self.ActiveField)
 
         self.BuildRunButton(frame, layout, RunAction)
 
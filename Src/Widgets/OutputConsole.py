@@ -0,0 +1,84 @@
+"""Append only output console shared by the widget pages."""
+
+import contextlib
+import os
+from pathlib import Path
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QPlainTextEdit, QWidget
+
+LOG_DIR: Path = Path(os.environ.get("LOCALAPPDATA", Path.home() / ".cache")) / "FileOpsGUI" / "Logs"
+
+
+class OutputConsole(QPlainTextEdit):
+    """Read only log which batches messages and only keeps the most recent lines on screen.
+
+    Messages are queued and written in one append per flush interval, so a burst of
+    thousands of lines costs a handful of layouts instead of one full rewrite each. Lines
+    pushed out past the block limit are spilled to a log file before Qt drops them.
+    """
+
+    def __init__(
+        self,
+        parent: QWidget,
+        name: str,
+        maxLines: int = 5000,
+        interval: int = 50,
+    ) -> None:
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(maxLines)
+        self.LogPath = LOG_DIR / f"{name}.log"
+        self.Pending: list[str] = []
+        self.Timer = QTimer(self)
+        self.Timer.setSingleShot(True)
+        self.Timer.setInterval(interval)
+        self.Timer.timeout.connect(self.Flush)
+
+    def Append(self, message: str) -> None:
+        """Queue a message for the next flush.
+
+        Parameters
+        ----------
+        message : str
+            text to show, may span several lines
+        """
+        self.Pending.append(message)
+        if not self.Timer.isActive():
+            self.Timer.start()
+
+    def Flush(self) -> None:
+        """Write every queued message in one append, keeping the view at the bottom if it was."""
+        if not self.Pending:
+            return
+        text = "\n".join(self.Pending)
+        self.Pending.clear()
+
+        lines = text.count("\n") + 1
+        document = self.document()
+        existing = 0 if document is None or document.isEmpty() else document.blockCount()
+        overflow = existing + lines - self.maximumBlockCount()
+        if document is not None and overflow > 0:
+            spilled = [document.findBlockByNumber(x).text() for x in range(min(overflow, existing))]
+            spilled += text.split("\n")[: max(overflow - existing, 0)]
+            self.Spill(spilled)
+
+        vBar = self.verticalScrollBar()
+        following = vBar is None or vBar.value() == vBar.maximum()
+        self.appendPlainText(text)
+        if following and vBar is not None:
+            vBar.setValue(vBar.maximum())
+
+    def Spill(self, lines: list[str]) -> None:
+        """Append lines about to scroll off the console to the log file.
+
+        Parameters
+        ----------
+        lines : list[str]
+            oldest lines first
+        """
+        # Losing scrollback is better than interrupting the operation being logged
+        with contextlib.suppress(OSError):
+            self.LogPath.parent.mkdir(parents=True, exist_ok=True)
+            with self.LogPath.open("a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
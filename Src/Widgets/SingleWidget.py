@@ -4,11 +4,12 @@ from collections.abc import Generator
 from pathlib import Path
 
 from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QLabel, QLineEdit, QTextEdit, QWidget
+from PyQt6.QtWidgets import QLabel, QLineEdit, QWidget
 
 from Src.Images.ImageSequences import CheckSeq
 from Src.Utilities.TranslateInPlace import TranslateV2
 from Src.Widgets.BaseWidget import BaseWidget
+from Src.Widgets.OutputConsole import OutputConsole
 
 
 class SingleWidget(BaseWidget):
@@ -16,7 +17,7 @@ class SingleWidget(BaseWidget):
 
     def __init__(self, parent: QWidget) -> None:
         super().__init__(parent)
-        self.OutputText = QTextEdit(self)
+        self.OutputText = OutputConsole(self, self.CleanName)
         masterFolderLabel = QLabel(self)
         masterFolderLabel.setText("<h1>Active Image</h1>")
         masterFolderLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -65,7 +66,7 @@ class SingleWidget(BaseWidget):
         def RunAction() -> Generator[str]:
             return TranslateV2(lang.text(), self.ActiveField)
 
-        self.BuildRunButton(frame, layout, RunAction)
+        self.BuildRunButton(frame, layout, RunAction, kind="cpu")
 
         self.Layout.addWidget(frame, 3, columnIdx, 3, 1)
 
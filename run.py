@@ -1,11 +1,10 @@
+import multiprocessing
 import sys
 
 from PyQt6.QtWidgets import QApplication, QMainWindow, QStyleFactory, QTabWidget
 from tendo import singleton
 
-from Src.Widgets import ImageWidget, MediaWidget, SingleWidget
-
-INSTANCE = singleton.SingleInstance()
+from Src.Widgets import ImageWidget, JobWidget, MediaWidget, SingleWidget
 
 
 class MainWindow(QMainWindow):
@@ -15,12 +14,15 @@ class MainWindow(QMainWindow):
         self.TabView.addTab(ImageWidget.ImageWidget(self.TabView), "Image Operations")
         self.TabView.addTab(MediaWidget.MediaWidget(self.TabView), "Media Operations")
         self.TabView.addTab(SingleWidget.SingleWidget(self.TabView), "Single Operations")
+        self.TabView.addTab(JobWidget.JobWidget(self.TabView), "Jobs")
         self.setCentralWidget(self.TabView)
 
         self.setWindowTitle("Media GUI")
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    INSTANCE = singleton.SingleInstance()
     app = QApplication(sys.argv)
     app.setStyle(QStyleFactory.create("Fusion"))
     window = MainWindow()